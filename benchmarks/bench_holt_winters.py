@@ -0,0 +1,68 @@
+"""
+Compare the batched NumPy Holt-Winters against per-series statsmodels fits.
+
+Usage (from the project root):
+    python benchmarks/bench_holt_winters.py --series 25 250 --years 10
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from forecast_engine import run_forecasts
+
+
+def synthetic_panel(n_series, n_years, seed=0):
+    """Seasonal series with trend and noise, monthly columns"""
+    rng = np.random.default_rng(seed)
+    n_months = n_years * 12
+    t = np.arange(n_months)
+    base = rng.uniform(50, 5000, size=(n_series, 1))
+    slope = rng.normal(0, 0.002, size=(n_series, 1)) * base
+    season = 0.1 * base * np.sin(2 * np.pi * (t + rng.integers(0, 12, size=(n_series, 1))) / 12)
+    noise = rng.normal(0, 0.03, size=(n_series, n_months)) * base
+    values = base + slope * t + season + noise
+    dates = pd.date_range('2000-01-01', periods=n_months, freq='MS').strftime('%Y-%m-%d')
+    return pd.DataFrame(values, index=[f'series_{i}' for i in range(n_series)], columns=dates)
+
+
+def time_backend(data, backend, months):
+    start = time.perf_counter()
+    forecasts, errors = run_forecasts(data, months=months, backend=backend)
+    return time.perf_counter() - start, forecasts, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--series', type=int, nargs='+', default=[25, 250])
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--skip-statsmodels-above', type=int, default=500,
+                        help="only run the numpy backend for larger panels")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    print(f"{'series':>8} {'statsmodels s':>14} {'numpy s':>10} {'speedup':>8} {'MAPE vs sm':>11}")
+    for n in args.series:
+        data = synthetic_panel(n, args.years)
+        np_time, np_fc, _ = time_backend(data, 'numpy', args.months)
+
+        if n > args.skip_statsmodels_above:
+            print(f"{n:>8} {'-':>14} {np_time:>10.3f} {'-':>8} {'-':>11}")
+            continue
+
+        sm_time, sm_fc, _ = time_backend(data, 'statsmodels', args.months)
+        sm = np.vstack([sm_fc[k].values for k in data.index])
+        nv = np.vstack([np_fc[k].values for k in data.index])
+        mape = np.mean(np.abs(nv - sm) / np.abs(sm)) * 100
+        print(f"{n:>8} {sm_time:>14.3f} {np_time:>10.3f} {sm_time / np_time:>7.0f}x {mape:>10.2f}%")
+
+
+if __name__ == "__main__":
+    main()
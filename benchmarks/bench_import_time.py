@@ -0,0 +1,90 @@
+"""
+Import-time benchmark for the analysis entry points.
+
+Imports each module in a fresh interpreter, reports the best wall time over
+a few repeats, and fails if a module goes over its budget or pulls in the
+plotting/modelling stack at import time.
+
+Usage (from the project root):
+    python benchmarks/bench_import_time.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Modules that table-only runs should never load just by importing
+HEAVY_MODULES = ['matplotlib', 'statsmodels', 'openpyxl']
+
+# Module -> import budget in seconds
+BUDGETS = {
+    'data_loader': 1.0,
+    'Combined_analysis': 1.0,
+    'correlation_analysis': 1.0,
+    'volatility_analysis': 1.0,
+    'yearly_analysis': 1.0,
+    'top_players_analysis': 1.0,
+    'demand_forecast': 1.0,
+    'supply_forecast': 1.0,
+    'pipeline': 1.0,
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'heavy': heavy}}))
+"""
+
+
+def measure(module, repeats=3):
+    """Best import time of a module in fresh interpreters, plus heavy modules it loaded"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    best = None
+    heavy = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, env=env, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best = result['seconds'] if best is None else min(best, result['seconds'])
+        heavy = result['heavy']
+    return best, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', dest='json_path', help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    print(f"{'module':<22} {'seconds':>8} {'budget':>7}  heavy imports")
+    for module, budget in BUDGETS.items():
+        seconds, heavy = measure(module, args.repeats)
+        results[module] = {'seconds': seconds, 'budget': budget, 'heavy': heavy}
+        flag = ''
+        if seconds > budget or heavy:
+            failures.append(module)
+            flag = '  <-- regression'
+        print(f"{module:<22} {seconds:>8.3f} {budget:>7.2f}  {', '.join(heavy) or '-'}{flag}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if failures:
+        print(f"\nImport regressions: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
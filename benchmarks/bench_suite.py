@@ -0,0 +1,226 @@
+"""
+Benchmark suite for the loader, the analyses and the forecasters.
+
+Every case runs on synthetic data at each panel size (number of series)
+and history length. Workbooks are written in the same layout as the JODI
+file: a demand and a supply sheet, countries down the first column and
+months across the first row. Each case reports the best and median of a
+few runs. Cases slower than --max-seconds on their first run are only
+timed once. The full grid takes a while: fitting every series of the
+25,000 x 50-year panel runs for several minutes on one core. Use --series,
+--years and --cases to narrow a run.
+
+Results are written as JSON. By default the file is
+./.cache/benchmarks/<commit>.json. --compare takes an earlier results
+file, flags cases that got slower than --threshold, and exits 1 if any
+did.
+
+Usage (from the project root):
+    python benchmarks/bench_suite.py --series 25 250 --years 10
+    python benchmarks/bench_suite.py --series 25 250 2500 25000 --years 10 50
+    python benchmarks/bench_suite.py --compare .cache/benchmarks/abc1234.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from bench_holt_winters import synthetic_panel
+from correlation_analysis import get_market_correlations, market_correlations
+from data_loader import GasolineDataset, clean_dataframe, load_gasoline_data, validate_dataframes
+from demand_forecast import forecast_demand
+from regions import RegionRegistry
+import rolling_stats
+from supply_forecast import forecast_supply
+from volatility_analysis import coefficient_of_variation
+
+DEMAND_SHEET = 'Demand in Thousand kl'
+SUPPLY_SHEET = 'Supply in Thousand kl'
+
+
+def synthetic_pair(n_series, n_years, seed=0):
+    """Demand and supply panels with a few gaps, like the raw sheets"""
+    demand = synthetic_panel(n_series, n_years, seed)
+    supply = demand * np.random.default_rng(seed + 1).normal(1.0, 0.05, size=demand.shape)
+    for df in (demand, supply):
+        df.index = [f'country_{i}' for i in range(n_series)]
+        df.index.name = 'Time/Country'
+        df.iloc[::7, ::11] = np.nan
+    return demand, supply
+
+
+def write_workbook(path, demand, supply):
+    """Write both panels as a two-sheet workbook in the JODI layout"""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for title, df in ((DEMAND_SHEET, demand), (SUPPLY_SHEET, supply)):
+        ws = wb.create_sheet(title)
+        ws.append(['Time/Country'] + list(pd.to_datetime(df.columns).to_pydatetime()))
+        for label, row in zip(df.index, df.to_numpy()):
+            ws.append([label] + [None if np.isnan(v) else float(v) for v in row])
+    wb.save(path)
+
+
+def measure(func, repeats, max_seconds):
+    """Best and median wall time; slow cases run once"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if times[0] > max_seconds:
+            break
+    return {'best': min(times), 'median': statistics.median(times), 'runs': len(times)}
+
+
+def wanted(name, prefixes):
+    return not prefixes or any(name.startswith(prefix) for prefix in prefixes)
+
+
+def build_cases(n_series, n_years, workdir, args):
+    """Benchmark name -> zero-argument callable for one panel size"""
+    raw_demand, raw_supply = synthetic_pair(n_series, n_years)
+    demand = clean_dataframe(raw_demand.copy(), 'Demand')
+    supply = clean_dataframe(raw_supply.copy(), 'Supply')
+    regions = RegionRegistry({f'region_{k}': list(demand.index[k::10]) for k in range(10)})
+    shared = GasolineDataset(demand, supply)
+
+    def fresh():
+        # A new dataset over the same read-only frames, so nothing is memoized between runs
+        return GasolineDataset(shared.demand, shared.supply, frozen=True)
+
+    def volatility():
+        dataset = fresh()
+        return coefficient_of_variation(dataset, 'demand'), coefficient_of_variation(dataset, 'supply')
+
+    cases = {
+        'clean_dataframe': lambda: clean_dataframe(raw_demand.copy(), 'Demand'),
+        'validate_dataframes': lambda: validate_dataframes(demand, supply),
+        'market_correlations': lambda: market_correlations(demand, supply),
+        'volatility': volatility,
+        'rolling_cv_12m': lambda: rolling_stats.rolling_cv(demand, 12),
+        'balance': lambda: fresh().balance.mean(axis=1).sort_values(),
+        'regional_balance': lambda: regions.aggregate(fresh().balance),
+        'forecast_demand_numpy_all': lambda: forecast_demand(demand, top_n=None, backend='numpy'),
+        'forecast_supply_numpy_all': lambda: forecast_supply(supply, top_n=None, backend='numpy'),
+        'forecast_demand_statsmodels_top6': lambda: forecast_demand(demand, backend='statsmodels'),
+        'forecast_supply_statsmodels_top6': lambda: forecast_supply(supply, backend='statsmodels'),
+    }
+
+    # The per-market loop is the reference implementation; keep it to sizes it can finish
+    if n_series <= args.max_loop_series:
+        cases['get_market_correlations'] = lambda: get_market_correlations(demand, supply)
+
+    # Writing large workbooks takes far longer than reading them
+    load_cases = ('load_gasoline_data_parse', 'load_gasoline_data_cached')
+    if n_series <= args.max_workbook_series and any(wanted(name, args.cases) for name in load_cases):
+        path = os.path.join(workdir, f'panel_{n_series}x{n_years}.xlsx')
+        write_workbook(path, raw_demand, raw_supply)
+        cache_dir = os.path.join(workdir, 'cache')
+        cases['load_gasoline_data_parse'] = lambda: load_gasoline_data(path, use_cache=False)
+        load_gasoline_data(path, cache_dir=cache_dir)
+        cases['load_gasoline_data_cached'] = lambda: load_gasoline_data(path, cache_dir=cache_dir)
+
+    return cases
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path, threshold):
+    """Print the ratio to an earlier run; return the cases that regressed"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['case'], r['series'], r['years']): r for r in json.load(f)['results']}
+
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for row in results:
+        old = baseline.get((row['case'], row['series'], row['years']))
+        if old is None:
+            continue
+        ratio = row['best'] / old['best'] if old['best'] > 0 else float('inf')
+        flag = ''
+        if ratio > threshold:
+            regressions.append(row)
+            flag = '  <-- regression'
+        print(f"  {row['case']:<34} {row['series']:>6} {row['years']:>3}y {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, nargs='+', default=[25, 250, 2500, 25000])
+    parser.add_argument('--years', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--cases', nargs='+', help="only run cases whose name starts with one of these")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--max-seconds', type=float, default=2.0,
+                        help="time a case only once when its first run takes longer")
+    parser.add_argument('--max-workbook-series', type=int, default=2500)
+    parser.add_argument('--max-loop-series', type=int, default=2500)
+    parser.add_argument('--output', help="results file (default: ./.cache/benchmarks/<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    logging.getLogger().setLevel(logging.WARNING)
+
+    commit = git_commit()
+    results = []
+    print(f"{'case':<34} {'series':>6} {'years':>5} {'best s':>9} {'median s':>9} {'runs':>4}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_years in args.years:
+            for n_series in args.series:
+                cases = build_cases(n_series, n_years, workdir, args)
+                for name, func in cases.items():
+                    if not wanted(name, args.cases):
+                        continue
+                    timing = measure(func, args.repeats, args.max_seconds)
+                    results.append({'case': name, 'series': n_series, 'years': n_years, **timing})
+                    print(f"{name:<34} {n_series:>6} {n_years:>5} {timing['best']:>9.4f} "
+                          f"{timing['median']:>9.4f} {timing['runs']:>4}", flush=True)
+
+    output = args.output or os.path.join('.cache', 'benchmarks', f'{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    report = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Content-addressed record of the files each pipeline stage writes to results/.
+
+A stage's key hashes the dataset fingerprint, the source of the stage
+module and the src/ modules it uses, and the stage parameters. After a
+stage runs, the manifest stores that key with the sha256 of every file the
+stage produced and the run that produced it. On the next run a stage whose
+key matches and whose files are still intact is skipped.
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import types
+from typing import Dict, Iterable, List
+
+from data_loader import file_sha256
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = "./results"
+MANIFEST_PATH = os.path.join(RESULTS_DIR, "manifest.json")
+
+# How many past runs the manifest keeps
+MAX_RUNS = 50
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _local_modules(module: types.ModuleType) -> List[types.ModuleType]:
+    """
+    The module plus every src/ module it references, directly or through
+    imported functions and classes, followed transitively.
+    """
+    seen = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        path = getattr(current, "__file__", None)
+        if current.__name__ in seen or not path or os.path.dirname(os.path.abspath(path)) != SRC_DIR:
+            continue
+        seen[current.__name__] = current
+        for value in vars(current).values():
+            if isinstance(value, types.ModuleType):
+                pending.append(value)
+            elif getattr(value, "__module__", None) in sys.modules:
+                pending.append(sys.modules[value.__module__])
+    return [seen[name] for name in sorted(seen)]
+
+
+def code_version(module: types.ModuleType) -> str:
+    """
+    Hash of the source files behind a stage module.
+    """
+    digest = hashlib.sha256()
+    for mod in _local_modules(module):
+        digest.update(mod.__name__.encode("utf-8"))
+        digest.update(file_sha256(mod.__file__).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def stage_key(module: types.ModuleType, data_fingerprint: str, params: Dict) -> str:
+    """
+    Input hash of one stage: data, code and parameters.
+    """
+    digest = hashlib.sha256()
+    digest.update(data_fingerprint.encode("utf-8"))
+    digest.update(code_version(module).encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def snapshot(root: str = RESULTS_DIR) -> Dict[str, tuple]:
+    """
+    (mtime_ns, size) of every file under root, used to see what a stage wrote.
+    """
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+def changed_files(before: Dict[str, tuple], after: Dict[str, tuple]) -> List[str]:
+    """
+    Files created or rewritten between two snapshots.
+    """
+    return sorted(path for path, stat in after.items() if before.get(path) != stat)
+
+
+class ArtifactManifest:
+    """
+    The results/manifest.json file: stage keys, artifact hashes and runs.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or MANIFEST_PATH
+        self.run_id = time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+        self.data = self._load()
+        self.data["runs"].append({"run": self.run_id, "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                  "stages": {}})
+        self.data["runs"] = self.data["runs"][-MAX_RUNS:]
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("stages", {})
+        data.setdefault("artifacts", {})
+        data.setdefault("runs", [])
+        return data
+
+    @property
+    def run(self) -> Dict:
+        return self.data["runs"][-1]
+
+    def is_current(self, stage: str, key: str) -> bool:
+        """
+        True when the stage last ran with this key and its files are unchanged.
+        """
+        entry = self.data["stages"].get(stage)
+        if entry is None or entry["key"] != key:
+            return False
+        for path in entry["artifacts"]:
+            recorded = self.data["artifacts"].get(path)
+            try:
+                if recorded is None or file_sha256(path) != recorded["sha256"]:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def skip(self, stage: str) -> None:
+        """
+        Note in this run that a stage was reused from an earlier run.
+        """
+        self.run["stages"][stage] = "unchanged"
+
+    def record(self, stage: str, key: str, outputs: Iterable[str]) -> None:
+        """
+        Store the stage key and hash the files it produced in this run.
+        """
+        artifacts = []
+        for path in sorted(set(outputs)):
+            try:
+                sha = file_sha256(path)
+            except OSError:
+                continue
+            # Files that were not rewritten (e.g. figures the render queue
+            # found unchanged) keep the run that produced their contents
+            entry = self.data["artifacts"].get(path)
+            run = entry["run"] if entry and entry["sha256"] == sha else self.run_id
+            self.data["artifacts"][path] = {"sha256": sha, "stage": stage, "run": run, "key": key}
+            artifacts.append(path)
+        self.data["stages"][stage] = {"key": key, "run": self.run_id, "artifacts": artifacts}
+        self.run["stages"][stage] = "ran"
+
+    def forget(self, stage: str) -> None:
+        """
+        Drop a stage's key so it runs again next time (e.g. after a failure).
+        """
+        self.data["stages"].pop(stage, None)
+        self.run["stages"][stage] = "failed"
+
+    def produced_by(self, run_id: str) -> List[str]:
+        """
+        Artifacts whose current contents were written by the given run.
+        """
+        return sorted(path for path, entry in self.data["artifacts"].items() if entry["run"] == run_id)
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write artifact manifest: %s", e)
@@ -0,0 +1,117 @@
+"""
+Monthly-to-calendar aggregation with precomputed group boundaries.
+
+CalendarGroups looks at the month columns once and works out where each
+year, quarter, season and gas year starts. Reductions then run over the
+whole (countries x months) matrix with np.add.reduceat, one segment per
+period, instead of resampling or filtering columns per period.
+
+Periods are labelled with their end date, like resample("YE"/"QE"):
+- year: calendar year
+- quarter: calendar quarter
+- season: meteorological seasons; December counts towards the next
+  year's winter (DJF), so winter labels end in February
+- gas_year: October to September, labelled by the September it ends in
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+FREQUENCIES = ('year', 'quarter', 'season', 'gas_year')
+
+
+def _period_ends(dates: pd.DatetimeIndex, freq: str) -> pd.DatetimeIndex:
+    """
+    End date of the period each month belongs to.
+    """
+    if freq == 'year':
+        return dates + pd.offsets.YearEnd(0)
+    if freq == 'quarter':
+        return dates + pd.offsets.QuarterEnd(0)
+    if freq == 'season':
+        # Dec/Jan/Feb -> end of Feb, Mar/Apr/May -> end of May, ...
+        return dates + pd.offsets.QuarterEnd(0, startingMonth=2)
+    if freq == 'gas_year':
+        return dates + pd.offsets.YearEnd(0, month=9)
+    raise ValueError(f"Unknown calendar frequency: {freq}")
+
+
+class CalendarGroups:
+    """
+    Segment boundaries of every calendar frequency for one set of month columns.
+    """
+
+    def __init__(self, dates):
+        dates = pd.DatetimeIndex(pd.to_datetime(dates))
+        # reduceat needs each period's months to be adjacent
+        self.order = np.argsort(dates.to_numpy(), kind='stable')
+        self.is_sorted = bool(np.all(self.order == np.arange(len(dates))))
+        self.dates = dates[self.order]
+        self._groups: Dict[str, Tuple[np.ndarray, pd.DatetimeIndex]] = {}
+        for freq in FREQUENCIES:
+            ends = _period_ends(self.dates, freq).to_numpy()
+            if len(ends) == 0:
+                starts = np.zeros(0, dtype=np.intp)
+            else:
+                starts = np.flatnonzero(np.r_[True, ends[1:] != ends[:-1]])
+            self._groups[freq] = (starts, pd.DatetimeIndex(ends[starts]))
+
+    def starts(self, freq: str) -> np.ndarray:
+        """
+        Index of the first month of each period.
+        """
+        return self._group(freq)[0]
+
+    def labels(self, freq: str) -> pd.DatetimeIndex:
+        """
+        End date of each period.
+        """
+        return self._group(freq)[1]
+
+    def _group(self, freq: str):
+        if freq not in self._groups:
+            raise ValueError(f"Unknown calendar frequency: {freq}")
+        return self._groups[freq]
+
+    def reduce(self, X: np.ndarray, freq: str = 'year') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-period sums and counts of present months for each row of X.
+
+        Missing values are skipped, so an all-missing period sums to zero
+        with a count of zero.
+        """
+        X = np.asarray(X, dtype=float)
+        if not self.is_sorted:
+            X = X[:, self.order]
+        starts = self.starts(freq)
+        if len(starts) == 0:
+            empty = np.zeros((X.shape[0], 0))
+            return empty, empty
+        present = np.isfinite(X)
+        sums = np.add.reduceat(np.where(present, X, 0.0), starts, axis=1)
+        counts = np.add.reduceat(present.astype(float), starts, axis=1)
+        return sums, counts
+
+    def sum_and_mean(self, frame: pd.DataFrame, freq: str = 'year') -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Per-period sums and means of a (countries x months) frame in one pass.
+
+        Same values as resample(...).sum() and .mean(): empty periods sum
+        to 0 and average to NaN.
+        """
+        sums, counts = self.reduce(frame.to_numpy(dtype=float), freq)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        labels = self.labels(freq)
+        return (pd.DataFrame(sums, index=frame.index, columns=labels),
+                pd.DataFrame(means, index=frame.index, columns=labels))
+
+    def aggregate(self, frame: pd.DataFrame, freq: str = 'year', how: str = 'sum') -> pd.DataFrame:
+        """
+        Per-period 'sum' or 'mean' of a (countries x months) frame.
+        """
+        if how not in ('sum', 'mean'):
+            raise ValueError(f"Unknown aggregation: {how}")
+        sums, means = self.sum_and_mean(frame, freq)
+        return sums if how == 'sum' else means
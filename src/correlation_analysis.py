@@ -1,11 +1,11 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 import os
-from data_loader import load_gasoline_data
+from data_loader import get_dataset
+import rolling_stats
+from rendering import draw
 
-# Quick setup for output folders
-os.makedirs('./results/figures/correlation', exist_ok=True)
-os.makedirs('./results/tables', exist_ok=True)
+FIGURE = './results/figures/correlation/demand_supply_correlation.png'
 
 def get_market_correlations(demand_data, supply_data):
     """Check how demand and supply move together for each market"""
@@ -22,8 +22,73 @@ def get_market_correlations(demand_data, supply_data):
     
     return pd.DataFrame(results)
 
+def _aligned_arrays(demand_data, supply_data):
+    """Demand/supply matrices over the markets and months both frames share"""
+    markets = demand_data.index[demand_data.index.isin(supply_data.index)]
+    months = demand_data.columns[demand_data.columns.isin(supply_data.columns)]
+    d = demand_data.loc[markets, months].to_numpy(dtype=float)
+    s = supply_data.loc[markets, months].to_numpy(dtype=float)
+    return markets, d, s
+
+def _shift_pair(d, s, lag):
+    """Pair demand at t with supply at t + lag"""
+    if lag > 0:
+        return d[:, :-lag], s[:, lag:]
+    if lag < 0:
+        return d[:, -lag:], s[:, :lag]
+    return d, s
+
+def _rank_rows(x):
+    """Average ranks along each row, NaN left in place"""
+    return pd.DataFrame(x).rank(axis=1).to_numpy()
+
+def _row_pearson(d, s):
+    """Pearson correlation of each row pair, ignoring months missing in either"""
+    both = np.isfinite(d) & np.isfinite(s)
+    d = np.where(both, d, 0.0)
+    s = np.where(both, s, 0.0)
+    n = both.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        d_dev = np.where(both, d - (d.sum(axis=1) / n)[:, None], 0.0)
+        s_dev = np.where(both, s - (s.sum(axis=1) / n)[:, None], 0.0)
+        cov = (d_dev * s_dev).sum(axis=1)
+        corr = cov / np.sqrt((d_dev * d_dev).sum(axis=1) * (s_dev * s_dev).sum(axis=1))
+    # Same as Series.corr: fewer than two paired months gives NaN
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+def market_correlation_values(demand_data, supply_data, method='pearson', lag=0):
+    """Vectorized demand-supply correlation for every shared market
+
+    Returns (markets, correlations). method is 'pearson' or 'spearman';
+    lag > 0 compares demand with supply `lag` months later.
+    """
+    markets, d, s = _aligned_arrays(demand_data, supply_data)
+    d, s = _shift_pair(d, s, lag)
+    if method == 'spearman':
+        both = np.isfinite(d) & np.isfinite(s)
+        d = _rank_rows(np.where(both, d, np.nan))
+        s = _rank_rows(np.where(both, s, np.nan))
+    elif method != 'pearson':
+        raise ValueError(f"Unknown correlation method: {method}")
+    return markets, _row_pearson(d, s)
+
+def market_correlations(demand_data, supply_data, method='pearson', lag=0):
+    """Vectorized replacement for get_market_correlations, same output layout"""
+    markets, corr = market_correlation_values(demand_data, supply_data, method, lag)
+    return pd.DataFrame({'market': markets, 'correlation': corr})
+
+def lagged_correlations(demand_data, supply_data, lags=range(-6, 7), method='pearson'):
+    """Correlation per market (rows) for each lag (columns)"""
+    table = {}
+    for lag in lags:
+        markets, table[lag] = market_correlation_values(demand_data, supply_data, method, lag)
+    return pd.DataFrame(table, index=markets)
+
 def plot_market_correlations(corr_data, top_markets=8):
     """Show which markets have strongest supply-demand relationships"""
+    import matplotlib.pyplot as plt
+    
     # Sort by correlation strength
     sorted_data = corr_data.sort_values('correlation', ascending=False)
     top_pos = sorted_data.head(top_markets)
@@ -54,44 +119,72 @@ def plot_market_correlations(corr_data, top_markets=8):
     plt.tight_layout()
     return fig
 
-# Run the analysis
-print("Checking market correlations...")
-
-# Load the data
-demand, supply = load_gasoline_data()
-
-if demand is None or supply is None:
-    print("No data - check files")
-else:
-    # Calculate all market correlations
-    correlations = get_market_correlations(demand, supply)
-    correlations = correlations.sort_values('correlation', ascending=False)
-    
-    # Create the chart
-    fig = plot_market_correlations(correlations)
-    plt.savefig('./results/figures/correlation/demand_supply_correlation.png', 
-                dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # Save the results
-    correlations.to_csv('./results/tables/correlation_results.csv', index=False)
-    
-    # Print key insights
-    avg_corr = correlations['correlation'].mean()
-    print(f"Average market correlation: {avg_corr:.3f}")
-    
-    print("\nMarkets with strongest tracking:")
-    for _, row in correlations.head(3).iterrows():
-        print(f"  {row['market']}: {row['correlation']:.3f}")
-    
-    print("\nMarkets with weakest tracking:")
-    for _, row in correlations.tail(3).iterrows():
-        print(f"  {row['market']}: {row['correlation']:.3f}")
-    
-    # Quick market efficiency note
-    if avg_corr > 0.7:
-        print("\n✅ Markets generally efficient - supply follows demand")
-    elif avg_corr > 0.4:
-        print("\n⚠️  Mixed efficiency - some markets disconnected")
+
+def save_correlation_chart(corr_data, show=True):
+    """Draw the correlation chart and save it to FIGURE"""
+    import matplotlib.pyplot as plt
+    
+    fig = plot_market_correlations(corr_data)
+    plt.savefig(FIGURE, dpi=300, bbox_inches='tight')
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+def main(dataset=None, show=True, plots=True, renderer=None):
+    """Run the correlation analysis (plots=False writes tables only, renderer queues the chart)"""
+    # Quick setup for output folders
+    if plots:
+        os.makedirs('./results/figures/correlation', exist_ok=True)
+    os.makedirs('./results/tables', exist_ok=True)
+    
+    print("Checking market correlations...")
+
+    # Load the data
+    if dataset is None:
+        dataset = get_dataset()
+
+    if dataset is None:
+        print("No data - check files")
     else:
-        print("\n❌ Low efficiency - supply/demand often move independently")
+        demand, supply = dataset.demand, dataset.supply
+    
+        # Calculate all market correlations
+        correlations = market_correlations(demand, supply)
+        correlations = correlations.sort_values('correlation', ascending=False)
+    
+        # Create the chart
+        if plots:
+            draw(renderer, save_correlation_chart, [FIGURE], correlations, show=show)
+    
+        # Save the results
+        correlations.to_csv('./results/tables/correlation_results.csv', index=False)
+        
+        # Rolling 12/24/36-month correlation, latest window per market
+        rolling_corr = {f'correlation_{w}m': rolling_stats.rolling_correlation(demand, supply, w)
+                        for w in rolling_stats.WINDOWS}
+        rolling_stats.latest(rolling_corr).to_csv('./results/tables/rolling_correlation.csv')
+    
+        # Print key insights
+        avg_corr = correlations['correlation'].mean()
+        print(f"Average market correlation: {avg_corr:.3f}")
+    
+        print("\nMarkets with strongest tracking:")
+        for _, row in correlations.head(3).iterrows():
+            print(f"  {row['market']}: {row['correlation']:.3f}")
+    
+        print("\nMarkets with weakest tracking:")
+        for _, row in correlations.tail(3).iterrows():
+            print(f"  {row['market']}: {row['correlation']:.3f}")
+    
+        # Quick market efficiency note
+        if avg_corr > 0.7:
+            print("\n✅ Markets generally efficient - supply follows demand")
+        elif avg_corr > 0.4:
+            print("\n⚠️  Mixed efficiency - some markets disconnected")
+        else:
+            print("\n❌ Low efficiency - supply/demand often move independently")
+
+
+if __name__ == "__main__":
+    main()
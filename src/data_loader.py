@@ -1,163 +1,575 @@
 """
 .Module for loading and processing gasoline supply-demand data from Excel files..
 """
-import openpyxl
 import pandas as pd
 import numpy as np
-from typing import Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, List
 import logging
 import os
 import glob
+import json
+import hashlib
+import shutil
+import time
+
+from calendar_agg import CalendarGroups
+from gap_fill import FILL_METHODS, fill_gaps
+from panel_store import PanelStore, write_panel_store
+from log_config import log_event
+from profiling import profile
+from validation import validate_panels
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# On-disk cache for cleaned frames (override with GASOLINE_CACHE_DIR)
+CACHE_DIR = os.environ.get("GASOLINE_CACHE_DIR", "./.cache/workbooks")
+
+# How clean_dataframe fills missing cells by default (see gap_fill.FILL_METHODS)
+DEFAULT_FILL = "linear"
+
+
+# Where find_excel_file remembers the workbooks it found (override with GASOLINE_REGISTRY)
+REGISTRY_PATH = os.environ.get("GASOLINE_REGISTRY", "./.cache/datasets.json")
+
+# Dataset picked when none is named (override with GASOLINE_DATASET)
+DEFAULT_DATASET = os.environ.get("GASOLINE_DATASET")
+
+# Possible file names and locations, in priority order
+SEARCH_NAMES = [
+    "clean_gasoline_demand_supply_dataset_for_european_market.xlsx",
+    "clean_gasoline_demand_supply_dataset_for_european_market.xls",
+    "gasoline_data.xlsx",
+    "gasoil_data.xlsx",
+    "*.xlsx",  # Any Excel file
+]
+
+SEARCH_LOCATIONS = [
+    "./data",
+    "../data",
+    ".",
+    "..",
+    "./data/raw",
+    "../data/raw",
+    "./docs",
+    "../docs",
+]
+
+
+def scan_datasets() -> List[Dict]:
+    """
+    Glob every search location and describe each workbook found.
+
+    Entries keep the search priority order, so the first one is the
+    workbook find_excel_file has always picked by default.
+    """
+    datasets = []
+    seen = set()
+    for location in SEARCH_LOCATIONS:
+        for name in SEARCH_NAMES:
+            for file in sorted(glob.glob(os.path.join(location, name))):
+                key = os.path.abspath(file)
+                # Skip duplicates reached through another location, and Office lock files
+                if key in seen or os.path.basename(file).startswith("~$"):
+                    continue
+                seen.add(key)
+                try:
+                    stat = os.stat(file)
+                except OSError:
+                    continue
+                if not os.path.isfile(file) or stat.st_size == 0:
+                    continue
+                datasets.append({
+                    "name": os.path.splitext(os.path.basename(file))[0],
+                    "path": file,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": file_sha256(file),
+                })
+    return datasets
+
+
+def _load_registry(registry_path: str) -> Optional[List[Dict]]:
+    try:
+        with open(registry_path, "r", encoding="utf-8") as f:
+            return json.load(f)["datasets"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_registry(registry_path: str, datasets: List[Dict]) -> None:
+    try:
+        os.makedirs(os.path.dirname(registry_path) or ".", exist_ok=True)
+        tmp_path = registry_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"datasets": datasets}, f, indent=1)
+        os.replace(tmp_path, registry_path)
+    except OSError as e:
+        logger.warning("Could not write dataset registry: %s", e)
 
-def find_excel_file() -> Optional[str]:
+
+def _select(datasets: List[Dict], dataset: Optional[str]) -> Optional[Dict]:
+    """
+    Pick a registry entry by name, path or unique name fragment (None = first).
+    """
+    if not datasets:
+        return None
+    if dataset is None:
+        return datasets[0]
+    for entry in datasets:
+        if dataset == entry["name"] or os.path.abspath(dataset) == os.path.abspath(entry["path"]):
+            return entry
+    matches = [entry for entry in datasets if dataset.lower() in entry["name"].lower()]
+    if len(matches) > 1:
+        names = ", ".join(entry["name"] for entry in matches)
+        raise ValueError(f"Dataset '{dataset}' is ambiguous: {names}")
+    return matches[0] if matches else None
+
+
+def list_datasets(rescan: bool = False, registry_path: str = None) -> List[Dict]:
+    """
+    All registered workbooks, scanning the search locations if needed.
+    """
+    registry_path = registry_path or REGISTRY_PATH
+    datasets = None if rescan else _load_registry(registry_path)
+    if datasets is None:
+        datasets = scan_datasets()
+        _save_registry(registry_path, datasets)
+    return datasets
+
+
+def find_excel_file(dataset: str = None, rescan: bool = False, registry_path: str = None) -> Optional[str]:
     """
     Automatically find the Excel file in the project structure.
+
+    Workbooks found by globbing the search locations are recorded in a
+    registry, so later calls only stat the selected file. The locations
+    are scanned again when the registry is missing, the selected file
+    changed or disappeared, or the name is not registered. Pass dataset
+    (a name, path or unique part of a name) to choose among several
+    workbooks; by default the first one found is used.
+    """
+    registry_path = registry_path or REGISTRY_PATH
+    dataset = dataset or DEFAULT_DATASET
+    datasets = None if rescan else _load_registry(registry_path)
+
+    try:
+        entry = _select(datasets, dataset) if datasets else None
+        if entry is not None:
+            try:
+                stat = os.stat(entry["path"])
+                if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+                    logger.debug("Found Excel file: %s", entry["path"])
+                    return entry["path"]
+            except OSError:
+                pass
+
+        # Registry missing or stale - scan the search locations again
+        datasets = list_datasets(rescan=True, registry_path=registry_path)
+        entry = _select(datasets, dataset)
+    except ValueError as e:
+        logger.error("%s", e)
+        return None
+
+    if entry is None:
+        if dataset is None:
+            logger.error("Could not find any Excel file")
+        else:
+            logger.error("Could not find dataset: %s", dataset)
+        return None
+    logger.debug("Found Excel file: %s", entry["path"])
+    return entry["path"]
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    Hash the raw bytes of a file in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_entry_dir(file_path: str, cache_dir: str) -> str:
     """
-    # Possible file names and locations
-    possible_names = [
-        "clean_gasoline_demand_supply_dataset_for_european_market.xlsx",
-        "clean_gasoline_demand_supply_dataset_for_european_market.xls",
-        "gasoline_data.xlsx",
-        "gasoil_data.xlsx",
-        "*.xlsx",  # Any Excel file
-    ]
+    Cache folder for a workbook, one per absolute path.
+    """
+    path_key = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, path_key)
+
+
+def _read_cache(file_path: str, cache_dir: str,
+                fill: list) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, Dict[str, pd.DataFrame]]]:
+    """
+    Return cached (demand, supply, fill masks) if the workbook and fill settings are unchanged.
+    """
+    entry = _cache_entry_dir(file_path, cache_dir)
+    meta_path = os.path.join(entry, "index.json")
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        stat = os.stat(file_path)
+        if meta["size"] != stat.st_size or meta.get("fill") != fill:
+            return None
+
+        # Same size but touched - only trust the cache if the bytes match
+        if meta["mtime_ns"] != stat.st_mtime_ns:
+            if meta["sha256"] != file_sha256(file_path):
+                return None
+            meta["mtime_ns"] = stat.st_mtime_ns
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        frames = []
+        masks = {}
+        for name in ("demand", "supply"):
+            values = np.load(os.path.join(entry, f"{name}.npy"), allow_pickle=False)
+            frame = pd.DataFrame(values, index=meta[f"{name}_index"], columns=meta[f"{name}_columns"])
+            frame.index.name = meta[f"{name}_index_name"]
+            frames.append(frame)
+            filled = np.load(os.path.join(entry, f"{name}_filled.npy"), allow_pickle=False)
+            masks[name] = pd.DataFrame(filled, index=frame.index, columns=frame.columns)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Ignoring unreadable cache for %s: %s", file_path, e)
+        return None
+
+    return frames[0], frames[1], masks
+
+
+def _write_cache(file_path: str, cache_dir: str, demand_df: pd.DataFrame, supply_df: pd.DataFrame,
+                 masks: Dict[str, pd.DataFrame], fill: list) -> None:
+    """
+    Store cleaned frames and their fill masks as .npy matrices plus a JSON index sidecar.
+    """
+    # Only plain numeric frames round-trip through .npy
+    for df in (demand_df, supply_df):
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+            logger.warning("Skipping cache - data contains non-numeric columns")
+            return
+
+    entry = _cache_entry_dir(file_path, cache_dir)
+    stat = os.stat(file_path)
+    meta = {
+        "path": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(file_path),
+        "fill": fill,
+    }
+    for name, df in (("demand", demand_df), ("supply", supply_df)):
+        meta[f"{name}_index"] = [str(i) for i in df.index]
+        meta[f"{name}_columns"] = [str(c) for c in df.columns]
+        meta[f"{name}_index_name"] = df.index.name
+
+    try:
+        # Write into a temp folder and swap it in so readers never see half an entry
+        tmp_entry = entry + ".tmp"
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        os.makedirs(tmp_entry)
+        np.save(os.path.join(tmp_entry, "demand.npy"), demand_df.to_numpy(dtype=np.float64))
+        np.save(os.path.join(tmp_entry, "supply.npy"), supply_df.to_numpy(dtype=np.float64))
+        for name, mask in masks.items():
+            np.save(os.path.join(tmp_entry, f"{name}_filled.npy"), mask.to_numpy(dtype=bool))
+        with open(os.path.join(tmp_entry, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_entry, entry)
+    except OSError as e:
+        logger.warning("Could not write cache for %s: %s", file_path, e)
+
+
+def clear_cache(cache_dir: str = None) -> None:
+    """
+    Remove all cached workbooks.
+    """
+    shutil.rmtree(cache_dir or CACHE_DIR, ignore_errors=True)
+
+
+def _pick_sheets(sheet_names: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Choose the demand and supply sheets from the workbook's sheet names.
+    """
+    logger.debug("Available sheets: %s", sheet_names)
     
-    possible_locations = [
-        "./data",
-        "../data", 
-        ".",
-        "..",
-        "./data/raw",
-        "../data/raw"
-    ]
+    # Try to find the correct sheet names
+    demand_sheet = None
+    supply_sheet = None
     
-    for location in possible_locations:
-        for name in possible_names:
-            search_pattern = os.path.join(location, name)
-            files = glob.glob(search_pattern)
-            for file in files:
-                if os.path.isfile(file) and os.path.getsize(file) > 0:
-                    logger.info(f"Found Excel file: {file}")
-                    return file
+    for sheet in sheet_names:
+        if 'demand' in sheet.lower():
+            demand_sheet = sheet
+        if 'supply' in sheet.lower():
+            supply_sheet = sheet
     
-    logger.error("Could not find any Excel file")
-    return None
+    # If we didn't find by name, use the first two sheets
+    if demand_sheet is None and len(sheet_names) >= 1:
+        demand_sheet = sheet_names[0]
+    if supply_sheet is None and len(sheet_names) >= 2:
+        supply_sheet = sheet_names[1]
+        
+    logger.debug("Using demand sheet: %s, supply sheet: %s", demand_sheet, supply_sheet)
+    return demand_sheet, supply_sheet
+
+
+def _read_workbook_pandas(file_path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Read both sheets through pd.read_excel on a single ExcelFile handle.
+    """
+    with pd.ExcelFile(file_path) as excel_file:
+        demand_sheet, supply_sheet = _pick_sheets(excel_file.sheet_names)
+        demand_df = pd.read_excel(excel_file, sheet_name=demand_sheet, index_col=0)
+        supply_df = pd.read_excel(excel_file, sheet_name=supply_sheet, index_col=0)
+    return demand_df, supply_df
+
+
+def _sheet_to_frame(worksheet) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Stream a read-only worksheet straight into a float matrix.
+
+    The first row holds the dates and the first column the countries,
+    matching pd.read_excel(..., index_col=0). Cells that are not numbers
+    (e.g. '-') become NaN; the returned mask marks where they were.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame(), np.zeros((0, 0), dtype=bool)
+
+    labels = []
+    values = []
+    for row in rows:
+        labels.append(row[0])
+        values.append(row[1:])
+
+    n_cols = len(header) - 1
+    matrix = np.full((len(values), n_cols), np.nan)
+    non_numeric = np.zeros((len(values), n_cols), dtype=bool)
+    for i, row in enumerate(values):
+        # Short rows are padded with NaN, blank cells come through as None
+        cells = [np.nan if v is None else v for v in row[:n_cols]]
+        try:
+            matrix[i, :len(cells)] = cells
+        except (TypeError, ValueError):
+            # Text in the row: convert cell by cell, keeping numbers stored as text
+            for j, v in enumerate(cells):
+                try:
+                    matrix[i, j] = float(v)
+                except (TypeError, ValueError):
+                    non_numeric[i, j] = True
 
+    columns = [f"Unnamed: {j + 1}" if h is None else h for j, h in enumerate(header[1:])]
+    df = pd.DataFrame(matrix, index=pd.Index(labels, name=header[0]), columns=pd.Index(columns))
+    return df, non_numeric
 
-def load_gasoline_data(file_path: str = None) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+
+def _read_workbook_single_pass(file_path: str) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Open the workbook once in read-only mode and stream both sheets.
+
+    Text cells are read as NaN and reported in the non-numeric masks.
+    Falls back to pandas if a sheet cannot be streamed.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        demand_sheet, supply_sheet = _pick_sheets(workbook.sheetnames)
+        demand_df, demand_text = _sheet_to_frame(workbook[demand_sheet])
+        supply_df, supply_text = _sheet_to_frame(workbook[supply_sheet])
+    except (TypeError, ValueError) as e:
+        logger.warning("Single-pass read failed (%s), falling back to pandas", e)
+        return _read_workbook_pandas(file_path) + ({},)
+    finally:
+        workbook.close()
+    return demand_df, supply_df, {"demand": demand_text, "supply": supply_text}
+
+
+def read_raw_workbook(file_path: str,
+                      engine: str = "stream") -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Demand and supply sheets as read, before any cleaning, plus non-numeric cell masks.
+
+    The "stream" engine reads text cells as NaN and returns a mask per
+    panel marking them, for validate_panels. "pandas" keeps the text in
+    the frames and returns no masks.
+    """
+    if engine not in ("stream", "pandas"):
+        raise ValueError(f"Unknown engine: {engine}")
+    with profile("read_workbook", "load", engine=engine, bytes=os.path.getsize(file_path)):
+        if engine == "stream":
+            return _read_workbook_single_pass(file_path)
+        return _read_workbook_pandas(file_path) + ({},)
+
+
+def load_gasoline_data(file_path: str = None, use_cache: bool = True,
+                       cache_dir: str = None,
+                       engine: str = "stream",
+                       fill: str = None,
+                       fill_limit: int = None) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
     """
     Load gasoline supply and demand data from Excel file.
+
+    Cleaned frames are cached on disk and reused until the workbook changes,
+    so repeat loads skip the Excel parse entirely. On a cache miss the
+    "stream" engine reads the workbook in one read-only pass; "pandas" uses
+    pd.read_excel. fill and fill_limit choose how clean_dataframe fills
+    missing cells.
+    """
+    loaded = _load_with_masks(file_path, use_cache, cache_dir, engine, fill, fill_limit)
+    if loaded is None:
+        return None, None
+    return loaded[0], loaded[1]
+
+
+def _load_with_masks(file_path: str = None, use_cache: bool = True, cache_dir: str = None,
+                     engine: str = "stream", fill: str = None,
+                     fill_limit: int = None) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, Dict[str, pd.DataFrame]]]:
+    """
+    load_gasoline_data plus the fill mask of each frame, or None on failure.
     """
     try:
         # If no file path provided, try to find it automatically
         if file_path is None:
             file_path = find_excel_file()
             if file_path is None:
-                return None, None
+                return None
         
         # Check if file exists
         if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path}")
-            return None, None
-        
-        logger.info(f"Loading data from: {file_path}")
-        
-        # First, let's see what sheets are available
-        excel_file = pd.ExcelFile(file_path)
-        logger.info(f"Available sheets: {excel_file.sheet_names}")
-        
-        # Try to find the correct sheet names
-        demand_sheet = None
-        supply_sheet = None
-        
-        for sheet in excel_file.sheet_names:
-            if 'demand' in sheet.lower():
-                demand_sheet = sheet
-            if 'supply' in sheet.lower():
-                supply_sheet = sheet
-        
-        # If we didn't find by name, use the first two sheets
-        if demand_sheet is None and len(excel_file.sheet_names) >= 1:
-            demand_sheet = excel_file.sheet_names[0]
-        if supply_sheet is None and len(excel_file.sheet_names) >= 2:
-            supply_sheet = excel_file.sheet_names[1]
-            
-        logger.info(f"Using demand sheet: {demand_sheet}")
-        logger.info(f"Using supply sheet: {supply_sheet}")
-        
-        # Load demand data
-        demand_df = pd.read_excel(
-            file_path, 
-            sheet_name=demand_sheet, 
-            index_col=0
-        )
-        
-        # Load supply data
-        supply_df = pd.read_excel(
-            file_path,
-            sheet_name=supply_sheet,
-            index_col=0
-        )
-        
-        # Clean the data
-        demand_df = clean_dataframe(demand_df, "Demand")
-        supply_df = clean_dataframe(supply_df, "Supply")
-        
-        logger.info(f"✅ Successfully loaded demand data: {demand_df.shape}")
-        logger.info(f"✅ Successfully loaded supply data: {supply_df.shape}")
-        
-        if not demand_df.empty:
-            logger.info(f"Time range: {demand_df.columns[0]} to {demand_df.columns[-1]}")
-            logger.info(f"Countries: {list(demand_df.index)}")
-        
-        return demand_df, supply_df
+            logger.error("File not found: %s", file_path)
+            return None
+        
+        with profile("load_gasoline_data", "load", file=os.path.basename(file_path)):
+            start = time.perf_counter()
+            fill = fill or DEFAULT_FILL
+            fill_key = [fill, fill_limit]
+            cache_dir = cache_dir or CACHE_DIR
+            if use_cache:
+                with profile("read_cache", "load"):
+                    cached = _read_cache(file_path, cache_dir, fill_key)
+                if cached is not None:
+                    _log_load(file_path, "cache", cached, fill, start)
+                    return cached
+        
+            logger.debug("Loading data from: %s", file_path)
+        
+            demand_df, supply_df, non_numeric = read_raw_workbook(file_path, engine)
+        
+            # Check the raw cells before cleaning fills anything in
+            with profile("validate_panels", "load"):
+                report = validate_panels(demand_df, supply_df, non_numeric=non_numeric)
+            level = logging.INFO if report.ok else logging.WARNING
+            if logger.isEnabledFor(level):
+                logger.log(level, "%s: %s", os.path.basename(file_path), report.describe())
+        
+            # Clean the data
+            demand_df, demand_mask = clean_dataframe(demand_df, "Demand", fill, fill_limit, return_mask=True)
+            supply_df, supply_mask = clean_dataframe(supply_df, "Supply", fill, fill_limit, return_mask=True)
+            masks = {"demand": demand_mask, "supply": supply_mask}
+        
+            if not demand_df.empty and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Time range: %s to %s", demand_df.columns[0], demand_df.columns[-1])
+                logger.debug("Countries: %s", list(demand_df.index))
+        
+            if use_cache:
+                with profile("write_cache", "load"):
+                    _write_cache(file_path, cache_dir, demand_df, supply_df, masks, fill_key)
+        
+            _log_load(file_path, "workbook", (demand_df, supply_df, masks), fill, start)
+            return demand_df, supply_df, masks
         
     except Exception as e:
-        logger.error(f"Error loading data: {e}")
-        return None, None
+        logger.error("Error loading data: %s", e)
+        return None
 
 
-def clean_dataframe(df: pd.DataFrame, name: str) -> pd.DataFrame:
+def _log_load(file_path: str, source: str, loaded: Tuple, fill: str, start: float) -> None:
+    """
+    Emit the structured "load" event for a finished load.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    demand_df, supply_df, masks = loaded
+    log_event(
+        logger, "load",
+        file=file_path,
+        bytes=os.path.getsize(file_path),
+        source=source,
+        rows=demand_df.shape[0],
+        cols=demand_df.shape[1],
+        supply_rows=supply_df.shape[0],
+        supply_cols=supply_df.shape[1],
+        fill=fill,
+        filled_cells=int(sum(mask.to_numpy().sum() for mask in masks.values())),
+        duration_s=round(time.perf_counter() - start, 6),
+    )
+
+
+def clean_dataframe(df: pd.DataFrame, name: str, fill: str = None, limit: int = None,
+                    return_mask: bool = False):
     """
     Clean the dataframe by handling missing values and formatting.
+
+    Text such as '-' counts as missing. Gaps are filled with one of
+    gap_fill.FILL_METHODS ('linear' by default, 'zero' for the old
+    behaviour); limit caps 'ffill'. Cells a method cannot reach stay NaN.
+    With return_mask, also returns a boolean frame marking the filled cells.
     """
-    # Remove any completely empty rows and columns
-    df = df.dropna(how='all').dropna(axis=1, how='all')
+    fill = fill or DEFAULT_FILL
+    if fill not in FILL_METHODS:
+        raise ValueError(f"Unknown fill method: {fill}")
+
+    with profile("clean_dataframe", "load", panel=name, fill=fill):
+        # Text placeholders become NaN, then completely empty rows and columns are removed
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+            df = df.apply(pd.to_numeric, errors='coerce')
+        df = df.dropna(how='all').dropna(axis=1, how='all')
     
-    # Convert column names to strings and clean them
-    df.columns = df.columns.astype(str)
+        # Convert column names to strings and clean them
+        df.columns = df.columns.astype(str)
     
-    # Fill missing values with 0
-    df = df.fillna(0)
+        # Fill missing values over the whole matrix at once
+        values = df.to_numpy(dtype=float)
+        first = pd.to_datetime(df.columns[:1], errors='coerce')
+        offset = first.month[0] - 1 if len(first) and not pd.isna(first[0]) else 0
+        filled, mask = fill_gaps(values, fill, limit, offset)
+        df = pd.DataFrame(filled, index=df.index, columns=df.columns)
     
-    logger.info(f"Cleaned {name} data: {df.shape}")
+    logger.debug("Cleaned %s data: %s (%s cells filled, %s)", name, df.shape, mask.sum(), fill)
+    if return_mask:
+        return df, pd.DataFrame(mask, index=df.index, columns=df.columns)
     return df
 
 
 def validate_dataframes(demand_df: pd.DataFrame, supply_df: pd.DataFrame) -> Dict[str, bool]:
     """
     Validate the loaded gasoline data for consistency.
+
+    Summarises validation.validate_panels as pass/fail flags; use that
+    directly (ideally on read_raw_workbook's frames) for the flagged cells.
     """
     if demand_df is None or supply_df is None:
         logger.error("Cannot validate - dataframes are None")
         return {}
         
+    report = validate_panels(demand_df, supply_df)
     validation_results = {}
     
-    validation_results["demand_has_nulls"] = demand_df.isnull().any().any()
-    validation_results["supply_has_nulls"] = supply_df.isnull().any().any()
-    validation_results["demand_has_negatives"] = (demand_df < 0).any().any()
-    validation_results["supply_has_negatives"] = (supply_df < 0).any().any()
+    validation_results["demand_has_nulls"] = report.count("missing", "demand") + report.count("non_numeric", "demand") > 0
+    validation_results["supply_has_nulls"] = report.count("missing", "supply") + report.count("non_numeric", "supply") > 0
+    validation_results["demand_has_negatives"] = report.count("negative", "demand") > 0
+    validation_results["supply_has_negatives"] = report.count("negative", "supply") > 0
     validation_results["indices_match"] = demand_df.index.equals(supply_df.index)
     validation_results["columns_match"] = demand_df.columns.equals(supply_df.columns)
     
     for check, result in validation_results.items():
         status = "PASS" if not result else "FAIL"
-        logger.info(f"Validation {check}: {status}")
+        logger.info("Validation %s: %s", check, status)
     
     return validation_results
 
@@ -192,7 +604,208 @@ def get_data_summary(demand_df: pd.DataFrame, supply_df: pd.DataFrame) -> Dict:
     return summary
 
 
+def _read_only(data):
+    """
+    The same frame or series over a read-only copy of its values.
+
+    Only for single-dtype data, which is all the dataset holds.
+    """
+    values = data.to_numpy(copy=True)
+    values.flags.writeable = False
+    if isinstance(data, pd.Series):
+        return pd.Series(values, index=data.index, name=data.name, copy=False)
+    return pd.DataFrame(values, index=data.index, columns=data.columns, copy=False)
+
+
+class GasolineDataset:
+    """
+    Loaded demand/supply data shared by all analyses in one process.
+
+    Frames handed out are shallow copies, so callers can relabel columns
+    without touching the shared data. The matrices behind them (and behind
+    the memoized derived quantities) are read-only: writing a value into
+    a handed-out frame either copies it first (pandas Copy-on-Write) or
+    raises, and never changes what later stages see.
+    """
+
+    def __init__(self, demand_df: pd.DataFrame, supply_df: pd.DataFrame, file_path: str = None,
+                 fill_masks: Dict[str, pd.DataFrame] = None, frozen: bool = False):
+        """
+        frozen=True means the frames already sit on read-only arrays (e.g.
+        a memory-mapped panel store) and are used without copying.
+        """
+        self.file_path = file_path
+        self._demand = demand_df if frozen else _read_only(demand_df)
+        self._supply = supply_df if frozen else _read_only(supply_df)
+        self._fill_masks = {name: _read_only(mask) for name, mask in (fill_masks or {}).items()}
+        self._dates = pd.DatetimeIndex(pd.to_datetime(demand_df.columns))
+        self._memo = {}
+
+    @classmethod
+    def load(cls, file_path: str = None, dataset: str = None, **kwargs) -> Optional["GasolineDataset"]:
+        """
+        Load the workbook (or a named dataset) and wrap it, or return None if loading failed.
+        """
+        if file_path is None:
+            file_path = find_excel_file(dataset)
+            if file_path is None:
+                return None
+        loaded = _load_with_masks(file_path, **kwargs)
+        if loaded is None:
+            return None
+        demand_df, supply_df, masks = loaded
+        return cls(demand_df, supply_df, file_path, masks)
+
+    @classmethod
+    def from_panel_store(cls, path: str) -> "GasolineDataset":
+        """
+        Wrap a memory-mapped panel store without copying its matrices.
+        """
+        store = PanelStore(path)
+        return cls(store.demand, store.supply, path, frozen=True)
+
+    def to_panel_store(self, path: str, dtype=np.float64) -> str:
+        """
+        Write the data as a panel store other processes can memory-map.
+        """
+        return write_panel_store(path, self._demand, self._supply, dtype=dtype)
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = _read_only(compute())
+        return self._memo[key].copy(deep=False)
+
+    def _frame(self, name: str) -> pd.DataFrame:
+        if name == "demand":
+            return self._demand
+        if name == "supply":
+            return self._supply
+        raise ValueError(f"Unknown frame: {name}")
+
+    @property
+    def demand(self) -> pd.DataFrame:
+        return self._demand.copy(deep=False)
+
+    @property
+    def supply(self) -> pd.DataFrame:
+        return self._supply.copy(deep=False)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return self._dates
+
+    @property
+    def countries(self) -> pd.Index:
+        return self._demand.index
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        sha256 of both matrices and their labels, independent of the source file.
+        """
+        if "fingerprint" not in self._memo:
+            digest = hashlib.sha256()
+            for df in (self._demand, self._supply):
+                digest.update(repr(list(df.index)).encode("utf-8"))
+                digest.update(repr(list(df.columns)).encode("utf-8"))
+                digest.update(np.ascontiguousarray(df.to_numpy(dtype=np.float64)).tobytes())
+            self._memo["fingerprint"] = digest.hexdigest()
+        return self._memo["fingerprint"]
+
+    def fill_mask(self, name: str) -> pd.DataFrame:
+        """
+        Boolean frame marking the demand or supply cells that were imputed.
+
+        All False when the data came without a mask (e.g. a panel store).
+        """
+        frame = self._frame(name)
+        return self._cached(("fill_mask", name), lambda: self._fill_masks.get(name, pd.DataFrame(
+            False, index=frame.index, columns=frame.columns)))
+
+    def observed(self, name: str) -> pd.DataFrame:
+        """
+        Demand or supply with the imputed cells set back to NaN.
+        """
+        return self._cached(("observed", name), lambda: self._frame(name).mask(self.fill_mask(name)))
+
+    def timeseries(self, name: str) -> pd.DataFrame:
+        """
+        Demand or supply with a DatetimeIndex on the columns.
+        """
+        return self._cached(("timeseries", name), lambda: self._frame(name).set_axis(self._dates, axis=1))
+
+    @property
+    def balance(self) -> pd.DataFrame:
+        """
+        Supply minus demand per country and month.
+        """
+        return self._cached(("balance",), lambda: self._supply - self._demand)
+
+    def row_mean(self, name: str) -> pd.Series:
+        return self._cached(("mean", name), lambda: self._frame(name).mean(axis=1))
+
+    def row_std(self, name: str) -> pd.Series:
+        return self._cached(("std", name), lambda: self._frame(name).std(axis=1))
+
+    @property
+    def calendar(self) -> CalendarGroups:
+        """
+        Year, quarter, season and gas-year boundaries of the month columns.
+        """
+        if "calendar" not in self._memo:
+            self._memo["calendar"] = CalendarGroups(self._dates)
+        return self._memo["calendar"]
+
+    def by_period(self, name: str, freq: str = "year", how: str = "sum") -> pd.DataFrame:
+        """
+        Per-country sum or mean per calendar period, with period-end dates as columns.
+
+        Sums and means come from the same pass and are memoized together.
+        """
+        if how not in ("sum", "mean"):
+            raise ValueError(f"Unknown aggregation: {how}")
+        key = ("calendar", name, freq, how)
+        if key not in self._memo:
+            sums, means = self.calendar.sum_and_mean(self._frame(name), freq)
+            self._memo[("calendar", name, freq, "sum")] = _read_only(sums)
+            self._memo[("calendar", name, freq, "mean")] = _read_only(means)
+        return self._memo[key].copy(deep=False)
+
+    def yearly(self, name: str, how: str = "sum") -> pd.DataFrame:
+        """
+        Per-country yearly sum or mean, with year-end dates as columns.
+        """
+        return self.by_period(name, "year", how)
+
+
+_datasets = {}
+
+
+def get_dataset(file_path: str = None, reload: bool = False, dataset: str = None,
+                **kwargs) -> Optional[GasolineDataset]:
+    """
+    Return the process-wide dataset for a workbook, loading it on first use.
+
+    Without a file_path the workbook comes from find_excel_file(dataset).
+    Each fill setting gets its own dataset.
+    """
+    if file_path is None:
+        file_path = find_excel_file(dataset)
+        if file_path is None:
+            return None
+    key = (os.path.abspath(file_path), kwargs.get("fill") or DEFAULT_FILL, kwargs.get("fill_limit"))
+    if reload or key not in _datasets:
+        dataset = GasolineDataset.load(file_path, **kwargs)
+        if dataset is None:
+            return None
+        _datasets[key] = dataset
+    return _datasets[key]
+
+
 if __name__ == "__main__":
+    from log_config import configure_logging
+
+    configure_logging()
     print("=== TESTING GASOLINE DATA LOADER ===\n")
     
     # First, let the function automatically find the file
@@ -0,0 +1,98 @@
+"""
+On-disk cache of per-series forecasts.
+
+Entries are keyed on a hash of the series' values, its last date and the
+model configuration, so a series is only refit when its own history or the
+configuration changes. The cache is capped in size and evicts the least
+recently used entries.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("GASOLINE_FORECAST_CACHE_DIR", "./.cache/forecasts")
+MAX_ENTRIES = 10_000
+
+
+class ForecastCache:
+    """
+    Least-recently-used store of forecast arrays, one .npz file per entry.
+
+    Recency is tracked through file modification times, so it survives
+    between runs without a separate index.
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = MAX_ENTRIES):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(series: pd.Series, config: Dict) -> str:
+        """
+        Fingerprint of one input series plus the model configuration.
+        """
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(series.to_numpy(dtype=float)).tobytes())
+        digest.update(str(series.index[-1]).encode('utf-8') if len(series) else b'')
+        digest.update(json.dumps(config, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, Optional[str]]]:
+        """
+        Return (values, error) for a key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                values = f['values']
+                error = str(f['error']) or None
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return values, error
+
+    def put(self, key: str, values: np.ndarray, error: Optional[str] = None) -> None:
+        """
+        Store one forecast. Call evict() once after a batch of puts.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path + '.tmp.npz'
+        try:
+            np.savez(tmp_path, values=np.asarray(values, dtype=float), error=np.array(error or ''))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write forecast cache entry: %s", e)
+
+    def evict(self) -> int:
+        """
+        Drop the least recently used entries beyond max_entries.
+        """
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.npz')]
+        except FileNotFoundError:
+            return 0
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return 0
+        entries.sort(key=lambda e: e.stat().st_mtime_ns)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        return excess
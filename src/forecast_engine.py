@@ -0,0 +1,466 @@
+"""
+Shared forecasting engine used by demand_forecast and supply_forecast.
+
+Besides the fitting, it holds the body both scripts share:
+run_panel_forecast picks the series of one panel, forecasts them, saves
+the table and the figure, and reports any series that fell back to a
+linear trend.
+
+Two backends are available. "statsmodels" fits one Holt-Winters model per
+series and fans the fits out over a process pool. "numpy" fits every series
+at once with the batched recursions in holt_winters.py. Results come back
+in input order, and a failed fit falls back to a linear trend with the
+error recorded for that series.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import holt_winters
+from forecast_cache import ForecastCache
+from profiling import pool_map, profile
+
+logger = logging.getLogger(__name__)
+
+# Persisted Holt-Winters states for warm-started refreshes
+STATE_DIR = os.environ.get("GASOLINE_STATE_DIR", "./.cache/forecast_state")
+
+# Series forecast by default (largest mean first); None forecasts every series
+TOP_N = 6
+
+# Most series drawn on one forecast figure
+PLOT_SERIES = 6
+
+FORECAST_DIR = './results/forecasts'
+FIGURE_DIR = './results/figures/forecasts'
+
+# Default refresh policy: full refit after this many new months, or when the
+# one-step error on new months exceeds this multiple of the in-sample error
+REFIT_EVERY = 12
+DRIFT_RATIO = 2.0
+
+
+def resolve_jobs(n_jobs: Optional[int]) -> int:
+    """
+    Turn an n_jobs setting into a worker count (None or -1 = all cores).
+    """
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count() or 1
+    return max(1, n_jobs)
+
+
+def future_dates(data: pd.DataFrame, months: int) -> pd.DatetimeIndex:
+    """
+    Month-start dates following the last column of the data.
+    """
+    last_date = pd.to_datetime(data.columns[-1])
+    return pd.date_range(start=last_date + pd.DateOffset(months=1), periods=months, freq='MS')
+
+
+def linear_trend_forecast(data: pd.DataFrame, months: int = 12) -> pd.DataFrame:
+    """
+    Extend each row's last value along its least-squares slope.
+
+    All slopes come from one closed-form regression over the whole
+    (series x month) matrix; missing cells are left out of each row's fit.
+    Returns a frame of series x future dates.
+    """
+    Y = data.to_numpy(dtype=float)
+    observed = np.isfinite(Y)
+    Y0 = np.where(observed, Y, 0.0)
+    x = np.arange(Y.shape[1], dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = observed.sum(axis=1)
+        x_mean = (observed * x).sum(axis=1) / n
+        y_mean = Y0.sum(axis=1) / n
+        x_dev = np.where(observed, x - x_mean[:, None], 0.0)
+        slope = (x_dev * (Y0 - y_mean[:, None])).sum(axis=1) / (x_dev * x_dev).sum(axis=1)
+    slope = np.where(np.isfinite(slope), slope, 0.0)
+
+    # Last observed value per row
+    last_pos = Y.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    last_val = np.where(n > 0, Y0[np.arange(len(Y)), last_pos], np.nan)
+
+    steps = np.arange(1, months + 1)
+    values = last_val[:, None] + slope[:, None] * steps[None, :]
+    return pd.DataFrame(values, index=data.index, columns=future_dates(data, months))
+
+
+def _fit_one(task: Tuple) -> Tuple[str, Optional[np.ndarray], str, Optional[str]]:
+    """
+    Fit a single series. Runs inside worker processes, so it must stay top level.
+
+    A failed fit returns no values; the caller fills in the linear trend
+    for all failures at once.
+    """
+    name, values, months, trend, seasonal, seasonal_periods = task
+    try:
+        from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+        model = ExponentialSmoothing(
+            values,
+            trend=trend,
+            seasonal=seasonal,
+            seasonal_periods=seasonal_periods
+        )
+        fitted = model.fit()
+        return name, np.asarray(fitted.forecast(months)), 'holt_winters', None
+    except Exception as e:
+        return name, None, 'linear_trend', f"{type(e).__name__}: {e}"
+
+
+def _fit_statsmodels(data: pd.DataFrame, series: List[str], months: int, trend: str,
+                     seasonal: str, seasonal_periods: int, n_jobs: int) -> List[Tuple]:
+    """
+    One statsmodels fit per series, optionally across worker processes.
+    """
+    tasks = [
+        (name, data.loc[name].to_numpy(dtype=float), months, trend, seasonal, seasonal_periods)
+        for name in series
+    ]
+
+    workers = min(resolve_jobs(n_jobs), len(tasks)) if tasks else 1
+    if workers > 1:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        metas = [{'country': str(name), 'backend': 'statsmodels'} for name in series]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return pool_map(executor, _fit_one, tasks, 'forecast_fit', 'forecast', metas, chunksize)
+
+    results = []
+    for name, task in zip(series, tasks):
+        with profile('forecast_fit', 'forecast', country=str(name), backend='statsmodels'):
+            results.append(_fit_one(task))
+    return results
+
+
+def _row_digests(Y: np.ndarray) -> np.ndarray:
+    """
+    Short hash of each row's values, used to spot revised history.
+    """
+    return np.array([hashlib.sha256(np.ascontiguousarray(row).tobytes()).hexdigest()[:16] for row in Y])
+
+
+def load_model_state(state_path: str) -> Optional[Dict]:
+    """
+    Read a persisted state file, or None if it is missing or unreadable.
+    """
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with np.load(state_path, allow_pickle=False) as f:
+            return {key: f[key] for key in f.files}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable forecast state %s: %s", state_path, e)
+        return None
+
+
+def save_model_state(state_path: str, state: Dict) -> None:
+    """
+    Write a state file atomically.
+    """
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    tmp_path = state_path + '.tmp.npz'
+    np.savez(tmp_path, **state)
+    os.replace(tmp_path, state_path)
+
+
+def refresh_model_state(data: pd.DataFrame, series: List[str], seasonal_periods: int,
+                        state_path: str, refit_every: int = REFIT_EVERY,
+                        drift_ratio: float = DRIFT_RATIO) -> Dict:
+    """
+    Bring the persisted Holt-Winters states up to date with the data.
+
+    Series whose stored history is unchanged are warm-started over the new
+    months only. A series is fully refit when it is new, its history was
+    revised, its one-step error on the new months drifts above
+    drift_ratio x its in-sample error, or refit_every months have passed
+    since its last full fit. The updated state is saved back to state_path.
+    """
+    Y = data.loc[series].to_numpy(dtype=float)
+    T = Y.shape[1]
+    names = np.array([str(name) for name in series])
+    stored = load_model_state(state_path)
+
+    pos = None
+    if stored is not None and int(stored['seasonal_periods'][0]) == seasonal_periods:
+        last_date = str(stored['last_date'][0])
+        if last_date in data.columns:
+            pos = data.columns.get_loc(last_date)
+
+    refit = np.ones(len(names), dtype=bool)
+    parts = []
+    order = []
+    if pos is not None:
+        stored_rows = {name: i for i, name in enumerate(stored['names'])}
+        old_digests = _row_digests(Y[:, :pos + 1])
+        warm = [
+            i for i, name in enumerate(names)
+            if name in stored_rows
+            and stored['valid'][stored_rows[name]]
+            and stored['digest'][stored_rows[name]] == old_digests[i]
+        ]
+        if warm:
+            keys = ('alpha', 'beta', 'gamma', 'level', 'trend', 'season', 'sse', 'n_obs', 'valid', 'fit_n_obs')
+            state = holt_winters.select({k: stored[k] for k in keys}, [stored_rows[names[i]] for i in warm])
+            new_months = T - (pos + 1)
+            if new_months > 0:
+                old_rmse = np.sqrt(state['sse'] / state['n_obs'])
+                state, sse_new = holt_winters.update(state, Y[warm, pos + 1:])
+                drifted = np.sqrt(sse_new / new_months) > drift_ratio * old_rmse
+            else:
+                drifted = np.zeros(len(warm), dtype=bool)
+            due = state['n_obs'] - state['fit_n_obs'] >= refit_every
+            keep = ~(drifted | due) & state['valid']
+            kept = np.asarray(warm)[keep]
+            refit[kept] = False
+            parts.append(holt_winters.select(state, keep))
+            order.extend(kept)
+
+    refit_rows = np.flatnonzero(refit)
+    if len(refit_rows):
+        state = holt_winters.fit(Y[refit_rows], seasonal_periods)
+        state['fit_n_obs'] = np.full(len(refit_rows), T)
+        parts.append(state)
+        order.extend(refit_rows)
+
+    logger.info("Forecast state: %d warm-started, %d refit", len(names) - len(refit_rows), len(refit_rows))
+
+    # Put the rows back in the order of `series`
+    state = holt_winters.combine(parts)
+    state = holt_winters.select(state, np.argsort(np.asarray(order)))
+    state['names'] = names
+    state['digest'] = _row_digests(Y)
+
+    # Stored series not asked for this time are still current if no new
+    # months arrived (e.g. they were served from the forecast cache)
+    saved = state
+    if pos is not None and pos == T - 1:
+        others = np.flatnonzero(~np.isin(stored['names'], names))
+        if len(others):
+            saved = holt_winters.combine([state, holt_winters.select({k: stored[k] for k in state}, others)])
+
+    save_model_state(state_path, {
+        **saved,
+        'last_date': np.array([str(data.columns[-1])]),
+        'seasonal_periods': np.array([seasonal_periods]),
+    })
+    return state
+
+
+def _fit_numpy(data: pd.DataFrame, series: List[str], months: int, trend: str,
+               seasonal: str, seasonal_periods: int, state_path: str = None) -> List[Tuple]:
+    """
+    Fit all series together with the batched NumPy Holt-Winters.
+
+    With a state_path, fitted states are persisted and warm-started on the
+    next call instead of refit from scratch.
+    """
+    if trend != 'add' or seasonal != 'add':
+        raise ValueError("numpy backend only supports additive trend and seasonality")
+
+    # Every series is fit in one batch, so there is one entry for all of them
+    with profile('forecast_fit', 'forecast', backend='numpy', series=len(series)):
+        if state_path is not None:
+            state = refresh_model_state(data, series, seasonal_periods, state_path)
+        else:
+            state = holt_winters.fit(data.loc[series].to_numpy(dtype=float), seasonal_periods)
+        values = holt_winters.forecast(state, months)
+
+    results = []
+    for i, name in enumerate(series):
+        if state['valid'][i]:
+            results.append((name, values[i], 'holt_winters', None))
+        else:
+            error = f"needs {2 * seasonal_periods} finite observations"
+            results.append((name, None, 'linear_trend', error))
+    return results
+
+
+def run_forecasts(data: pd.DataFrame, series: List[str] = None, months: int = 12,
+                  trend: str = 'add', seasonal: str = 'add', seasonal_periods: int = 12,
+                  n_jobs: int = 1, backend: str = 'statsmodels',
+                  state_path: str = None,
+                  cache: ForecastCache = None) -> Tuple[Dict[str, pd.Series], Dict[str, str]]:
+    """
+    Forecast each row of the data, returning (forecasts, errors).
+
+    Forecasts are date-indexed Series in the order of `series`. Errors maps
+    each series that fell back to a linear trend to the reason its
+    Holt-Winters fit failed. n_jobs only applies to the statsmodels backend
+    and state_path (incremental refresh) only to the numpy backend. With a
+    cache, series whose history and configuration are unchanged are served
+    from it and only the rest are fit.
+    """
+    if series is None:
+        series = list(data.index)
+
+    dates = future_dates(data, months)
+    forecasts = {}
+    errors = {}
+
+    keys = {}
+    todo = list(series)
+    if cache is not None:
+        config = {'trend': trend, 'seasonal': seasonal, 'seasonal_periods': seasonal_periods,
+                  'months': months, 'backend': backend}
+        todo = []
+        for name in series:
+            keys[name] = cache.key(data.loc[name], config)
+            hit = cache.get(keys[name])
+            if hit is None:
+                todo.append(name)
+                continue
+            forecasts[name] = pd.Series(hit[0], index=dates, name=name)
+            if hit[1] is not None:
+                errors[name] = hit[1]
+        logger.info("Forecast cache: %d hits, %d to fit", len(series) - len(todo), len(todo))
+
+    if not todo:
+        results = []
+    elif backend == 'statsmodels':
+        results = _fit_statsmodels(data, todo, months, trend, seasonal, seasonal_periods, n_jobs)
+    elif backend == 'numpy':
+        results = _fit_numpy(data, todo, months, trend, seasonal, seasonal_periods, state_path)
+    else:
+        raise ValueError(f"Unknown forecast backend: {backend}")
+
+    failed = [name for name, _, _, error in results if error is not None]
+    fallback = None
+    if failed:
+        with profile('linear_trend_fallback', 'forecast', series=len(failed)):
+            fallback = linear_trend_forecast(data.loc[failed], months)
+
+    for name, values, method, error in results:
+        if error is None:
+            forecasts[name] = pd.Series(values, index=dates, name=name)
+        else:
+            errors[name] = error
+            forecasts[name] = fallback.loc[name].rename(name)
+            logger.warning("%s: Holt-Winters failed (%s), used linear trend", name, error)
+        if cache is not None:
+            cache.put(keys[name], forecasts[name].to_numpy(), error)
+
+    if cache is not None and results:
+        cache.evict()
+
+    # Keep the caller's series order
+    forecasts = {name: forecasts[name] for name in series}
+    return forecasts, errors
+
+
+def forecast_top(data: pd.DataFrame, months: int = 12, top_n: Optional[int] = TOP_N,
+                 **kwargs) -> Tuple[Dict[str, pd.Series], Dict[str, str]]:
+    """
+    Forecast the top_n series by mean (None = every country and region row).
+
+    Returns run_forecasts' (forecasts, errors); kwargs go to run_forecasts.
+    """
+    if top_n is None:
+        series = list(data.index)
+    else:
+        series = list(data.mean(axis=1).nlargest(top_n).index)
+    return run_forecasts(data, series, months, **kwargs)
+
+
+def figure_path(panel: str) -> str:
+    return os.path.join(FIGURE_DIR, f'{panel}_forecast.png')
+
+
+def plot_forecasts(history: pd.DataFrame, forecasts: Dict[str, pd.Series], label: str,
+                   output: str, show: bool = True) -> None:
+    """
+    History and forecast of each series on one chart, saved to output.
+    """
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 8))
+    for name, forecast in forecasts.items():
+        hist = history.loc[name]
+        plt.plot(pd.to_datetime(hist.index), hist.values,
+                 label=f'{name} - Hist', linewidth=2, alpha=0.7)
+        plt.plot(forecast.index, forecast.values,
+                 label=f'{name} - Forecast', linewidth=2, linestyle='--')
+
+    plt.title(f'{label} Forecast - Top {len(forecasts)} Countries')
+    plt.xlabel('Date')
+    plt.ylabel(f'{label} (Thousand kl)')
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.grid(True, alpha=0.3)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+
+    plt.savefig(output, dpi=300, bbox_inches='tight')
+    if show:
+        plt.show()
+    plt.close()
+
+
+def save_forecasts(forecasts: Dict[str, pd.Series], panel: str) -> pd.DataFrame:
+    """
+    Write the forecasts (future dates x series) to the panel's CSV.
+    """
+    df = pd.DataFrame(forecasts)
+    df.to_csv(os.path.join(FORECAST_DIR, panel, f'{panel}_forecasts.csv'))
+    return df
+
+
+def run_panel_forecast(panel: str, dataset=None, show: bool = True, n_jobs: int = 1,
+                       backend: str = 'statsmodels', use_cache: bool = True, plots: bool = True,
+                       renderer=None, top_n: Optional[int] = TOP_N, months: int = 12) -> Optional[Dict[str, pd.Series]]:
+    """
+    Forecast one panel ('demand' or 'supply'), save the table and figure and print a summary.
+    """
+    from data_loader import get_dataset
+    from rendering import draw
+
+    label = panel.capitalize()
+    print(f"Running {panel} forecast...")
+    os.makedirs(os.path.join(FORECAST_DIR, panel), exist_ok=True)
+    if plots:
+        os.makedirs(FIGURE_DIR, exist_ok=True)
+
+    if dataset is None:
+        dataset = get_dataset()
+    if dataset is None:
+        print(f"No {panel} data")
+        return None
+
+    data = getattr(dataset, panel)
+
+    # The numpy backend keeps fitted states so monthly refreshes are cheap
+    state_path = os.path.join(STATE_DIR, f'{panel}.npz') if backend == 'numpy' else None
+    cache = ForecastCache() if use_cache else None
+    forecasts, errors = forecast_top(data, months, top_n, n_jobs=n_jobs, backend=backend,
+                                     state_path=state_path, cache=cache)
+
+    if plots:
+        # Only the largest series go on the chart, and only their history into the figure job
+        shown = dict(list(forecasts.items())[:PLOT_SERIES])
+        draw(renderer, plot_forecasts, [figure_path(panel)], data.loc[list(shown)], shown, label,
+             figure_path(panel), show=show)
+
+    save_forecasts(forecasts, panel)
+
+    print(f"\n{label} Forecast Summary ({len(forecasts)} series):")
+    for name in list(forecasts)[:3]:
+        current = data.loc[name].iloc[-1]
+        forecast_avg = forecasts[name].mean()
+        change = ((forecast_avg - current) / current) * 100
+        print(f"{name}:")
+        print(f"  Current: {current:,.0f}")
+        print(f"  Forecast: {forecast_avg:,.0f}")
+        print(f"  Change: {change:+.1f}%")
+
+    if errors:
+        print(f"\nLinear trend used for {len(errors)} series where Holt-Winters failed:")
+        for name, error in errors.items():
+            print(f"  {name}: {error}")
+
+    print(f"\nFiles saved in results/forecasts/{panel}/")
+    return forecasts
@@ -0,0 +1,138 @@
+"""
+Gap filling for (countries x months) matrices.
+
+Every strategy works on the whole array at once: the previous and next
+observed month of each cell come from running max/min accumulations over
+column positions, so no country or month is visited in a Python loop.
+
+Strategies:
+- zero: replace gaps with 0 (the original behaviour)
+- linear: straight line between the observed months on either side;
+  leading and trailing gaps take the nearest observed value
+- seasonal: the same, but between the same calendar month in the
+  neighbouring years, so the seasonal shape is kept; month slots never
+  observed fall back to linear
+- ffill: carry the last observed value forward, at most `limit` months
+- seasonal_naive: the value from twelve months earlier, repeated across
+  multi-year gaps
+
+Cells a strategy cannot reach (ffill beyond its limit, seasonal_naive in
+the first year) stay NaN.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+FILL_METHODS = ('zero', 'linear', 'seasonal', 'ffill', 'seasonal_naive')
+SEASON = 12
+
+
+def _neighbours(valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Position of the last observed cell at or before, and the first at or
+    after, each cell along axis 1 (-1 / T where there is none).
+    """
+    T = valid.shape[1]
+    idx = np.arange(T)
+    prev = np.maximum.accumulate(np.where(valid, idx, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(valid, idx, T)[:, ::-1], axis=1)[:, ::-1]
+    return prev, nxt
+
+
+def linear_fill(X: np.ndarray) -> np.ndarray:
+    """
+    Linear interpolation along each row, edges held at the nearest value.
+    """
+    valid = np.isfinite(X)
+    if valid.all():
+        return X.copy()
+    T = X.shape[1]
+    prev, nxt = _neighbours(valid)
+    rows = np.arange(X.shape[0])[:, None]
+    x_prev = X[rows, np.clip(prev, 0, T - 1)]
+    x_next = X[rows, np.clip(nxt, 0, T - 1)]
+    has_prev, has_next = prev >= 0, nxt < T
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = (np.arange(T) - prev) / (nxt - prev)
+        between = x_prev + weight * (x_next - x_prev)
+    filled = np.where(has_prev & has_next, between,
+                      np.where(has_prev, x_prev, np.where(has_next, x_next, np.nan)))
+    return np.where(valid, X, filled)
+
+
+def ffill(X: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Forward fill along each row, at most `limit` consecutive months.
+    """
+    valid = np.isfinite(X)
+    prev, _ = _neighbours(valid)
+    rows = np.arange(X.shape[0])[:, None]
+    reach = prev >= 0
+    if limit is not None:
+        reach &= (np.arange(X.shape[1]) - prev) <= limit
+    return np.where(valid, X, np.where(reach, X[rows, np.clip(prev, 0, None)], np.nan))
+
+
+def _by_season(X: np.ndarray, offset: int) -> Tuple[np.ndarray, int]:
+    """
+    Reshape (S, T) to (S * 12, years) so each row is one country's calendar month.
+
+    offset is the month-of-year position of the first column (0 = January).
+    """
+    S, T = X.shape
+    n_years = -(-(offset + T) // SEASON)
+    padded = np.full((S, n_years * SEASON), np.nan)
+    padded[:, offset:offset + T] = X
+    return padded.reshape(S, n_years, SEASON).transpose(0, 2, 1).reshape(S * SEASON, n_years), n_years
+
+
+def _from_season(Y: np.ndarray, S: int, T: int, n_years: int, offset: int) -> np.ndarray:
+    return Y.reshape(S, SEASON, n_years).transpose(0, 2, 1).reshape(S, n_years * SEASON)[:, offset:offset + T]
+
+
+def seasonal_fill(X: np.ndarray, offset: int = 0) -> np.ndarray:
+    """
+    Interpolate each calendar month across years; never-seen months go linear.
+    """
+    S, T = X.shape
+    by_season, n_years = _by_season(X, offset)
+    filled = _from_season(linear_fill(by_season), S, T, n_years, offset)
+    # Month slots with no observation in any year are still empty
+    return np.where(np.isfinite(filled), filled, linear_fill(X))
+
+
+def seasonal_naive(X: np.ndarray) -> np.ndarray:
+    """
+    Fill each gap with the value twelve months earlier, chaining across years.
+
+    That is a forward fill of every month slot across the years.
+    """
+    S, T = X.shape
+    by_season, n_years = _by_season(X, 0)
+    return _from_season(ffill(by_season), S, T, n_years, 0)
+
+
+def fill_gaps(X: np.ndarray, method: str = 'linear', limit: Optional[int] = None,
+              offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fill the NaNs of a (countries x months) matrix; returns (filled, fill mask).
+
+    The mask marks the cells that were filled. offset is the calendar
+    month of the first column (0 = January), used by 'seasonal'.
+    """
+    X = np.asarray(X, dtype=float)
+    missing = ~np.isfinite(X)
+    if method == 'zero':
+        filled = np.where(missing, 0.0, X)
+    elif method == 'linear':
+        filled = linear_fill(X)
+    elif method == 'seasonal':
+        filled = seasonal_fill(X, offset)
+    elif method == 'ffill':
+        filled = ffill(X, limit)
+    elif method == 'seasonal_naive':
+        filled = seasonal_naive(X)
+    else:
+        raise ValueError(f"Unknown fill method: {method}")
+    return filled, missing & np.isfinite(filled)
@@ -0,0 +1,215 @@
+"""
+Batched additive Holt-Winters in NumPy.
+
+Runs the level/trend/seasonal recursions for a whole (series x time)
+matrix at once, and picks smoothing parameters for every series together
+with a coarse grid search followed by a local refinement around each
+series' best point.
+"""
+import itertools
+from typing import Dict
+
+import numpy as np
+
+# Coarse search grid for the smoothing parameters
+ALPHA_GRID = np.array([0.05, 0.15, 0.25, 0.35, 0.5, 0.65, 0.8, 0.95])
+BETA_GRID = np.array([0.0, 0.01, 0.05, 0.1, 0.2, 0.35])
+GAMMA_GRID = np.array([0.0, 0.05, 0.1, 0.2, 0.35, 0.5])
+
+# Cap on series x candidates x season cells held in memory per batch
+MAX_BATCH_CELLS = 4_000_000
+
+
+def initial_state(Y: np.ndarray, m: int):
+    """
+    Heuristic start values from the first two seasons of each series.
+    """
+    first = Y[:, :m].mean(axis=1)
+    second = Y[:, m:2 * m].mean(axis=1)
+    level = first
+    trend = (second - first) / m
+    season = Y[:, :m] - first[:, None]
+    return level, trend, season
+
+
+def filter_states(Y: np.ndarray, alpha, beta, gamma, level, trend, season, start: int = 0):
+    """
+    Run the additive recursions over the columns of Y.
+
+    Parameters broadcast against a trailing candidate axis: Y is (S, T),
+    alpha/beta/gamma/level/trend are (S, G) and season is (S, G, m).
+    `start` is the time position of Y's first column, which decides the
+    seasonal slot it falls in. Returns (level, trend, season, sse); the
+    state arrays are updated copies.
+    """
+    level = np.array(level, dtype=float)
+    trend = np.array(trend, dtype=float)
+    season = np.array(season, dtype=float)
+    m = season.shape[-1]
+    sse = np.zeros(level.shape)
+
+    for t in range(Y.shape[1]):
+        y = Y[:, t][:, None]
+        slot = (start + t) % m
+        s = season[..., slot]
+        base = level + trend
+        err = y - (base + s)
+        sse += err * err
+
+        new_level = alpha * (y - s) + (1 - alpha) * base
+        season[..., slot] = gamma * (y - base) + (1 - gamma) * s
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+
+    return level, trend, season, sse
+
+
+def _candidate_grid():
+    """
+    All (alpha, beta, gamma) combinations respecting beta <= alpha and
+    gamma <= 1 - alpha.
+    """
+    combos = [
+        (a, b, g) for a, b, g in itertools.product(ALPHA_GRID, BETA_GRID, GAMMA_GRID)
+        if b <= a and g <= 1 - a
+    ]
+    return np.array(combos)
+
+
+def _search(Y: np.ndarray, candidates: np.ndarray, m: int) -> np.ndarray:
+    """
+    Evaluate per-series candidate parameters and return each series' best.
+
+    candidates is (S, G, 3).
+    """
+    S, G, _ = candidates.shape
+    level0, trend0, season0 = initial_state(Y, m)
+    alpha, beta, gamma = candidates[..., 0], candidates[..., 1], candidates[..., 2]
+    _, _, _, sse = filter_states(
+        Y, alpha, beta, gamma,
+        np.repeat(level0[:, None], G, axis=1),
+        np.repeat(trend0[:, None], G, axis=1),
+        np.repeat(season0[:, None, :], G, axis=1),
+    )
+    best = np.argmin(np.where(np.isfinite(sse), sse, np.inf), axis=1)
+    return candidates[np.arange(S), best]
+
+
+def _refine_candidates(best: np.ndarray) -> np.ndarray:
+    """
+    Local grid around each series' best coarse point.
+    """
+    steps = np.array([-0.05, -0.02, 0.0, 0.02, 0.05])
+    offsets = np.array(list(itertools.product(steps, steps, steps)))
+    candidates = np.clip(best[:, None, :] + offsets[None, :, :], 0.0, 1.0)
+    # Keep every candidate inside the same admissible region as the coarse grid
+    candidates[..., 1] = np.minimum(candidates[..., 1], candidates[..., 0])
+    candidates[..., 2] = np.minimum(candidates[..., 2], 1 - candidates[..., 0])
+    return candidates
+
+
+def fit(Y: np.ndarray, m: int = 12) -> Dict[str, np.ndarray]:
+    """
+    Fit additive Holt-Winters to every row of Y.
+
+    Returns a dict of per-series arrays: alpha, beta, gamma, level, trend,
+    season (S, m), sse and n_obs. Rows shorter than two seasons or holding
+    non-finite values are marked invalid and get NaN parameters.
+    """
+    Y = np.asarray(Y, dtype=float)
+    S, T = Y.shape
+    valid = np.isfinite(Y).all(axis=1) & (T >= 2 * m)
+
+    params = np.full((S, 3), np.nan)
+    coarse = _candidate_grid()
+    batch = max(1, MAX_BATCH_CELLS // (len(coarse) * m))
+
+    rows = np.flatnonzero(valid)
+    for lo in range(0, len(rows), batch):
+        idx = rows[lo:lo + batch]
+        Yb = Y[idx]
+        best = _search(Yb, np.broadcast_to(coarse, (len(idx),) + coarse.shape), m)
+        params[idx] = _search(Yb, _refine_candidates(best), m)
+
+    level = np.full(S, np.nan)
+    trend = np.full(S, np.nan)
+    season = np.full((S, m), np.nan)
+    sse = np.full(S, np.nan)
+    if len(rows):
+        p = params[rows]
+        level0, trend0, season0 = initial_state(Y[rows], m)
+        lv, tr, se, err = filter_states(
+            Y[rows], p[:, :1], p[:, 1:2], p[:, 2:3],
+            level0[:, None], trend0[:, None], season0[:, None, :],
+        )
+        level[rows], trend[rows], season[rows], sse[rows] = lv[:, 0], tr[:, 0], se[:, 0], err[:, 0]
+
+    return {
+        'alpha': params[:, 0],
+        'beta': params[:, 1],
+        'gamma': params[:, 2],
+        'level': level,
+        'trend': trend,
+        'season': season,
+        'sse': sse,
+        'n_obs': np.full(S, T),
+        'valid': valid,
+    }
+
+
+def forecast(state: Dict[str, np.ndarray], months: int) -> np.ndarray:
+    """
+    Forecast `months` steps ahead from fitted states, shape (S, months).
+    """
+    season = state['season']
+    m = season.shape[1]
+    h = np.arange(1, months + 1)
+    slots = (state['n_obs'][:, None] + h[None, :] - 1) % m
+    seasonal = np.take_along_axis(season, slots, axis=1)
+    return state['level'][:, None] + h[None, :] * state['trend'][:, None] + seasonal
+
+
+def update(state: Dict[str, np.ndarray], Y_new: np.ndarray):
+    """
+    Warm-start the fitted states over newly observed columns.
+
+    Keeps each series' smoothing parameters and continues the recursions
+    from its last level/trend/season, so the cost is proportional to the
+    new columns only. Returns (new_state, sse_new) where sse_new is the
+    one-step-ahead squared error over the new observations.
+    """
+    Y_new = np.asarray(Y_new, dtype=float)
+    start = state['n_obs']
+    if len(start) and not (start == start[0]).all():
+        raise ValueError("all series must share the same number of observations")
+
+    level, trend, season, sse_new = filter_states(
+        Y_new,
+        state['alpha'][:, None], state['beta'][:, None], state['gamma'][:, None],
+        state['level'][:, None], state['trend'][:, None], state['season'][:, None, :],
+        start=int(start[0]) if len(start) else 0,
+    )
+    new_state = dict(state)
+    new_state.update({
+        'level': level[:, 0],
+        'trend': trend[:, 0],
+        'season': season[:, 0],
+        'sse': state['sse'] + sse_new[:, 0],
+        'n_obs': state['n_obs'] + Y_new.shape[1],
+        'valid': state['valid'] & np.isfinite(Y_new).all(axis=1),
+    })
+    return new_state, sse_new[:, 0]
+
+
+def select(state: Dict[str, np.ndarray], rows) -> Dict[str, np.ndarray]:
+    """
+    Per-series state for a subset of rows.
+    """
+    return {key: value[rows] for key, value in state.items()}
+
+
+def combine(states) -> Dict[str, np.ndarray]:
+    """
+    Stack several per-series states into one.
+    """
+    return {key: np.concatenate([s[key] for s in states]) for key in states[0]}
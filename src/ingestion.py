@@ -0,0 +1,399 @@
+"""
+Append-only ingestion of monthly JODI release workbooks.
+
+Each release is parsed once. Only months the store has not seen yet are
+appended, as a new chunk, and the running aggregates behind the yearly,
+balance and market-leader tables are updated from that chunk alone. A
+manifest records which files were processed so re-running is a no-op.
+
+Each ingest writes its aggregates to a new file and then replaces the
+manifest, which names the current aggregates file, in one step. A crash
+before that step leaves the previous manifest and aggregates in place,
+so the release is ingested again from scratch and nothing is counted
+twice. Means and variances are kept as per-country centred moments and
+merged chunk by chunk (Chan et al.), which keeps their precision on
+large-magnitude series.
+
+Usage (from the project root):
+    python src/ingestion.py data/releases/
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DEFAULT_FILL, load_gasoline_data, file_sha256
+from gap_fill import FILL_METHODS
+from log_config import LOG_MODE, LOG_MODES, configure_logging
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.environ.get("GASOLINE_STORE_DIR", "./data/store")
+RELEASE_DIR = "./data/releases"
+# Kept apart from the workbook analyses' tables, which use the same names
+TABLES_DIR = "./results/tables/store"
+
+# Per-country running stats kept for each of demand, supply and balance
+_SUM_FIELDS = ('count', 'mean', 'm2', 'positive', 'negative', 'max', 'min')
+
+# Aggregates file of stores written before the manifest named it
+_LEGACY_AGGREGATES = 'aggregates.npz'
+
+
+def _empty_manifest() -> Dict:
+    return {'files': [], 'months': [], 'countries': {'demand': [], 'supply': [], 'balance': []}}
+
+
+def load_manifest(store_dir: str = None) -> Dict:
+    """
+    Read the store manifest, or an empty one for a new store.
+    """
+    path = os.path.join(store_dir or STORE_DIR, 'manifest.json')
+    if not os.path.exists(path):
+        return _empty_manifest()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path: str, payload: Dict) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _load_aggregates(store_dir: str, manifest: Dict) -> Dict[str, np.ndarray]:
+    """
+    The aggregates the manifest points to, or none for a new store.
+    """
+    path = os.path.join(store_dir, manifest.get('aggregates', _LEGACY_AGGREGATES))
+    if not os.path.exists(path):
+        return {}
+    with np.load(path, allow_pickle=False) as f:
+        aggregates = {key: f[key] for key in f.files}
+    # Older stores kept raw sums; convert them to centred moments
+    for name in ('demand', 'supply', 'balance'):
+        if f'{name}_sum' in aggregates:
+            total = aggregates.pop(f'{name}_sum')
+            sumsq = aggregates.pop(f'{name}_sumsq')
+            count = aggregates[f'{name}_count']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(count > 0, total / count, 0.0)
+            aggregates[f'{name}_mean'] = mean
+            aggregates[f'{name}_m2'] = np.clip(sumsq - count * mean ** 2, 0.0, None)
+    return aggregates
+
+
+def _grow_rows(array: np.ndarray, n_rows: int, fill: float) -> np.ndarray:
+    """
+    Pad a per-country array with rows for countries seen for the first time.
+    """
+    if array.shape[0] >= n_rows:
+        return array
+    pad = np.full((n_rows - array.shape[0],) + array.shape[1:], fill)
+    return np.concatenate([array, pad])
+
+
+def _update_running(aggregates: Dict, name: str, values: np.ndarray) -> None:
+    """
+    Fold a (countries x new months) block into the running per-country stats.
+    """
+    n = values.shape[0]
+    fills = {'max': -np.inf, 'min': np.inf}
+    for field in _SUM_FIELDS:
+        key = f'{name}_{field}'
+        aggregates[key] = _grow_rows(aggregates.get(key, np.zeros(0)), n, fills.get(field, 0.0))
+
+    present = np.isfinite(values)
+    v = np.where(present, values, 0.0)
+
+    # Centred moments of the new block, merged into the running ones
+    n_new = present.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_new = np.where(n_new > 0, v.sum(axis=1) / n_new, 0.0)
+    m2_new = np.where(present, values - mean_new[:, None], 0.0)
+    m2_new = (m2_new * m2_new).sum(axis=1)
+    n_old = aggregates[f'{name}_count']
+    total = n_old + n_new
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.where(total > 0, n_new / total, 0.0)
+    delta = mean_new - aggregates[f'{name}_mean']
+    aggregates[f'{name}_mean'] = aggregates[f'{name}_mean'] + delta * weight
+    aggregates[f'{name}_m2'] = aggregates[f'{name}_m2'] + m2_new + delta * delta * n_old * weight
+    aggregates[f'{name}_count'] = total
+    aggregates[f'{name}_positive'] += (v > 0).sum(axis=1)
+    aggregates[f'{name}_negative'] += (v < 0).sum(axis=1)
+    aggregates[f'{name}_max'] = np.maximum(
+        aggregates[f'{name}_max'], np.where(present, values, -np.inf).max(axis=1, initial=-np.inf))
+    aggregates[f'{name}_min'] = np.minimum(
+        aggregates[f'{name}_min'], np.where(present, values, np.inf).min(axis=1, initial=np.inf))
+
+
+def _update_yearly(aggregates: Dict, name: str, values: np.ndarray, years: np.ndarray) -> None:
+    """
+    Add the new months' per-country totals into their calendar years.
+
+    Expects aggregates['years'] to already list every year in `years`.
+    """
+    known = aggregates['years']
+    key = f'{name}_yearly'
+    table = _grow_rows(aggregates.get(key, np.zeros((0, len(known)))), values.shape[0], 0.0)
+    if table.shape[1] < len(known):
+        table = np.concatenate([table, np.zeros((table.shape[0], len(known) - table.shape[1]))], axis=1)
+    for year in np.unique(years):
+        col = int(np.flatnonzero(known == year)[0])
+        table[:, col] += np.nansum(values[:, years == year], axis=1)
+    aggregates[key] = table
+
+
+def _align(frame: pd.DataFrame, countries: List[str]) -> np.ndarray:
+    """
+    Rows of a release in the store's country order, appending new countries.
+    """
+    for country in frame.index:
+        if country not in countries:
+            countries.append(country)
+    return frame.reindex(countries).to_numpy(dtype=float)
+
+
+def ingest_release(file_path: str, store_dir: str = None, fill: str = None) -> Optional[Dict]:
+    """
+    Append the new months of one release to the store.
+
+    Returns the manifest entry for the file, or None if it was already
+    ingested or could not be read. Months already in the store are left
+    untouched: the store is append-only. Gaps in the release are filled
+    with clean_dataframe's fill method (default DEFAULT_FILL), which is
+    recorded in the entry.
+    """
+    fill = fill or DEFAULT_FILL
+    store_dir = store_dir or STORE_DIR
+    manifest = load_manifest(store_dir)
+    digest = file_sha256(file_path)
+    if any(entry['sha256'] == digest for entry in manifest['files']):
+        logger.info("Already ingested: %s", file_path)
+        return None
+    previous = manifest.get('aggregates')
+
+    demand, supply = load_gasoline_data(file_path, use_cache=False, fill=fill)
+    if demand is None or supply is None:
+        logger.error("Could not read release: %s", file_path)
+        return None
+
+    stored_months = set(manifest['months'])
+    new_months = [m for m in demand.columns if m not in stored_months and m in supply.columns]
+    skipped = len(demand.columns) - len(new_months)
+    if skipped:
+        logger.info("%s: %d months already stored, ignoring revisions", file_path, skipped)
+
+    entry = {
+        'file': os.path.abspath(file_path),
+        'sha256': digest,
+        'size': os.path.getsize(file_path),
+        'months': new_months,
+        'chunk': None,
+        'fill': fill,
+        'ingested_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+    if new_months:
+        countries = manifest['countries']
+        d = _align(demand[new_months], countries['demand'])
+        s = _align(supply[new_months], countries['supply'])
+        shared = [c for c in countries['supply'] if c in countries['demand']]
+        for c in shared:
+            if c not in countries['balance']:
+                countries['balance'].append(c)
+        b = (supply[new_months].reindex(countries['balance']).to_numpy(dtype=float)
+             - demand[new_months].reindex(countries['balance']).to_numpy(dtype=float))
+
+        chunk = f"{len(manifest['files']) + 1:05d}"
+        chunk_dir = os.path.join(store_dir, 'chunks')
+        os.makedirs(chunk_dir, exist_ok=True)
+        np.savez(os.path.join(chunk_dir, f'{chunk}.npz'), demand=d, supply=s,
+                 months=np.array(new_months))
+        entry['chunk'] = chunk
+
+        aggregates = _load_aggregates(store_dir, manifest)
+        years = pd.to_datetime(pd.Index(new_months)).year.to_numpy()
+        known = aggregates.get('years', np.zeros(0, dtype=int))
+        aggregates['years'] = np.concatenate([known, np.setdiff1d(np.unique(years), known)])
+        aggregates['years_months'] = _grow_rows(aggregates.get('years_months', np.zeros(0)),
+                                                len(aggregates['years']), 0.0)
+        for year in years:
+            aggregates['years_months'][aggregates['years'] == year] += 1
+        for name, values in (('demand', d), ('supply', s), ('balance', b)):
+            _update_running(aggregates, name, values)
+            _update_yearly(aggregates, name, values, years)
+        # A new file per chunk; it only becomes current when the manifest names it
+        manifest['aggregates'] = f'aggregates-{chunk}.npz'
+        np.savez(os.path.join(store_dir, manifest['aggregates']), **aggregates)
+
+        manifest['months'].extend(new_months)
+
+    manifest['files'].append(entry)
+    os.makedirs(store_dir, exist_ok=True)
+    _write_json(os.path.join(store_dir, 'manifest.json'), manifest)
+    if new_months:
+        old_path = os.path.join(store_dir, previous or _LEGACY_AGGREGATES)
+        if os.path.exists(old_path):
+            os.remove(old_path)
+    logger.info("Ingested %s: %d new months", file_path, len(new_months))
+    return entry
+
+
+def pending_releases(release_dir: str = None, store_dir: str = None) -> List[str]:
+    """
+    Release workbooks in a folder that are not in the manifest yet, by name.
+    """
+    manifest = load_manifest(store_dir)
+    done = {entry['file'] for entry in manifest['files']}
+    files = sorted(glob.glob(os.path.join(release_dir or RELEASE_DIR, '*.xlsx')))
+    return [f for f in files if os.path.abspath(f) not in done]
+
+
+def load_store(store_dir: str = None) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    """
+    Rebuild full demand/supply frames from the stored chunks.
+
+    Gaps inside a release were filled when it was ingested, with the
+    method recorded in its manifest entry. Countries that first appeared
+    in a later release are 0 for the months before it.
+    """
+    store_dir = store_dir or STORE_DIR
+    manifest = load_manifest(store_dir)
+    if not manifest['months']:
+        return None, None
+
+    frames = {'demand': [], 'supply': []}
+    for entry in manifest['files']:
+        if entry['chunk'] is None:
+            continue
+        with np.load(os.path.join(store_dir, 'chunks', f"{entry['chunk']}.npz"), allow_pickle=False) as f:
+            months = [str(m) for m in f['months']]
+            for name in frames:
+                values = f[name]
+                countries = manifest['countries'][name][:values.shape[0]]
+                frames[name].append(pd.DataFrame(values, index=countries, columns=months))
+
+    result = []
+    for name in ('demand', 'supply'):
+        df = pd.concat(frames[name], axis=1).reindex(manifest['countries'][name]).fillna(0)
+        df.index.name = 'Time/Country'
+        result.append(df)
+    return result[0], result[1]
+
+
+def derived_tables(store_dir: str = None) -> Dict[str, pd.DataFrame]:
+    """
+    Yearly totals, balance summary and market leaders from the running aggregates.
+    """
+    store_dir = store_dir or STORE_DIR
+    manifest = load_manifest(store_dir)
+    agg = _load_aggregates(store_dir, manifest)
+    if not agg:
+        return {}
+    countries = manifest['countries']
+
+    def series(name, field):
+        return pd.Series(agg[f'{name}_{field}'], index=countries[name])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_demand = series('demand', 'mean').where(series('demand', 'count') > 0)
+        avg_supply = series('supply', 'mean').where(series('supply', 'count') > 0)
+        leaders = pd.DataFrame({
+            'avg_demand': avg_demand,
+            'avg_supply': avg_supply,
+            'net_position': avg_supply - avg_demand,
+        })
+        leaders.index.name = 'Time/Country'
+
+        count = series('balance', 'count')
+        mean = series('balance', 'mean').where(count > 0)
+        var = series('balance', 'm2') / (count - 1)
+        balance = pd.DataFrame({
+            'Avg_Balance': mean,
+            'Balance_Volatility': np.sqrt(var),
+            'Surplus_Percent': series('balance', 'positive') / count * 100,
+            'Deficit_Percent': series('balance', 'negative') / count * 100,
+            'Max_Surplus': series('balance', 'max'),
+            'Max_Deficit': series('balance', 'min'),
+        })
+    balance['Status'] = np.where(balance['Avg_Balance'] > 0, 'Net Exporter', 'Net Importer')
+    balance.index.name = 'Country'
+    balance = balance.sort_values('Avg_Balance', ascending=False)
+
+    order = np.argsort(agg['years'])
+    yearly = pd.DataFrame({
+        'Demand': agg['demand_yearly'].sum(axis=0)[order],
+        'Supply': agg['supply_yearly'].sum(axis=0)[order],
+        'Months': agg['years_months'][order].astype(int),
+    }, index=pd.Index(agg['years'][order], name='Year'))
+    yearly['Balance'] = yearly['Supply'] - yearly['Demand']
+
+    return {
+        'market_leaders_summary': leaders,
+        'balance_summary': balance,
+        'yearly_summary': yearly,
+    }
+
+
+def write_tables(store_dir: str = None, tables_dir: str = None) -> List[str]:
+    """
+    Write the derived tables as CSVs and return their paths.
+    """
+    tables_dir = tables_dir or TABLES_DIR
+    os.makedirs(tables_dir, exist_ok=True)
+    paths = []
+    for name, table in derived_tables(store_dir).items():
+        path = os.path.join(tables_dir, f'{name}.csv')
+        table.to_csv(path)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    """Ingest new release files and refresh the derived tables"""
+    parser = argparse.ArgumentParser(description="Append new JODI releases to the data store")
+    parser.add_argument('paths', nargs='*', help=f"release files or folders (default: {RELEASE_DIR})")
+    parser.add_argument('--store', default=STORE_DIR, help="store folder")
+    parser.add_argument('--tables', default=TABLES_DIR, help="where to write derived tables")
+    parser.add_argument('--fill', choices=FILL_METHODS, default=DEFAULT_FILL,
+                        help="how missing cells in a release are filled")
+    parser.add_argument('--log', choices=LOG_MODES, default=LOG_MODE, help="log output: text, json or quiet")
+    args = parser.parse_args(argv)
+    configure_logging(args.log)
+
+    files = []
+    missing = []
+    for path in args.paths or [RELEASE_DIR]:
+        if os.path.isdir(path):
+            files.extend(pending_releases(path, args.store))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            missing.append(path)
+    for path in missing:
+        print(f"No such release file or folder: {path}")
+    if missing and not files:
+        return 1
+
+    ingested = [entry for entry in (ingest_release(f, args.store, args.fill) for f in files) if entry]
+    print(f"Ingested {len(ingested)} new release(s), "
+          f"{sum(len(e['months']) for e in ingested)} new months")
+
+    if ingested:
+        for path in write_tables(args.store, args.tables):
+            print(f"Updated {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Logging setup for the command line entry points, and structured events.
+
+Library modules only create their loggers; nothing configures the root
+logger on import. Entry points call configure_logging with one of the
+modes:
+- text: INFO and above as LEVEL:logger:message lines
+- json: INFO and above, one JSON object per line; event fields become keys
+- quiet: warnings and errors only, for production batch runs
+
+The default mode comes from GASOLINE_LOG. log_event emits a named event
+with key/value fields (e.g. a completed load) and builds nothing when its
+level is disabled.
+"""
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+LOG_MODES = ('text', 'json', 'quiet')
+
+# Mode used when an entry point does not choose one (override with GASOLINE_LOG)
+LOG_MODE = os.environ.get('GASOLINE_LOG', 'text')
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: time, level, logger, message and any event fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        event = getattr(record, 'event', None)
+        if event is not None:
+            payload['event'] = event
+            payload.update(record.fields)
+        else:
+            payload['message'] = record.getMessage()
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class _Fields:
+    """
+    key=value rendering of event fields, only built if a text handler formats it.
+    """
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return ' '.join(f"{key}={value}" for key, value in self.fields.items())
+
+
+def configure_logging(mode: str = None, level: Optional[int] = None) -> None:
+    """
+    Install a single stderr handler on the root logger for the given mode.
+
+    Calling it again replaces the handler installed by the previous call.
+    """
+    mode = mode or LOG_MODE
+    if mode not in LOG_MODES:
+        raise ValueError(f"Unknown log mode: {mode}")
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if mode == 'json' else logging.Formatter(logging.BASIC_FORMAT))
+    handler._gasoline = True
+
+    root = logging.getLogger()
+    for old in [h for h in root.handlers if getattr(h, '_gasoline', False)]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level if level is not None else (logging.WARNING if mode == 'quiet' else logging.INFO))
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields) -> None:
+    """
+    Log a named event with key/value fields, if the level is enabled.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, "%s %s", event, _Fields(fields), extra={'event': event, 'fields': fields})
@@ -0,0 +1,108 @@
+"""
+Compact on-disk panel store for the demand and supply matrices.
+
+Each matrix is a plain float32/float64 .npy file, with the country and date
+labels kept in separate arrays. Opening the store memory-maps the matrices
+read-only, so frames built from it are zero-copy views and several worker
+processes reading the same store share the OS page cache instead of each
+holding its own copy.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+PANELS = ('demand', 'supply')
+
+
+def write_panel_store(path: str, demand_df: pd.DataFrame, supply_df: pd.DataFrame,
+                      dtype=np.float64) -> str:
+    """
+    Write demand/supply frames to a panel store folder and return its path.
+
+    Both frames must share the same month columns; their country indexes
+    may differ.
+    """
+    if not demand_df.columns.equals(supply_df.columns):
+        raise ValueError("demand and supply must have the same month columns")
+
+    os.makedirs(path, exist_ok=True)
+    dates = pd.to_datetime(demand_df.columns).to_numpy(dtype='datetime64[D]')
+    np.save(os.path.join(path, 'dates.npy'), dates)
+    for name, df in zip(PANELS, (demand_df, supply_df)):
+        np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(df.to_numpy(dtype=dtype)))
+        np.save(os.path.join(path, f'{name}_countries.npy'), np.array([str(c) for c in df.index]))
+    return path
+
+
+class PanelStore:
+    """
+    Read-only, memory-mapped view of a panel store folder.
+    """
+
+    def __init__(self, path: str, mmap_mode: Optional[str] = 'r'):
+        self.path = path
+        self.dates = np.load(os.path.join(path, 'dates.npy'))
+        self._values = {}
+        self._countries = {}
+        for name in PANELS:
+            self._values[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+            self._countries[name] = np.load(os.path.join(path, f'{name}_countries.npy'))
+
+    def values(self, name: str) -> np.ndarray:
+        """
+        The raw (countries x months) matrix, memory-mapped.
+        """
+        return self._values[name]
+
+    def countries(self, name: str) -> np.ndarray:
+        return self._countries[name]
+
+    @property
+    def columns(self) -> pd.Index:
+        """
+        Month labels formatted like clean_dataframe's columns.
+        """
+        return pd.Index(np.datetime_as_string(self.dates, unit='D'))
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """
+        DataFrame over the memory-mapped matrix without copying it.
+        """
+        return pd.DataFrame(self._values[name], index=pd.Index(self._countries[name], name='Time/Country'),
+                            columns=self.columns, copy=False)
+
+    @property
+    def demand(self) -> pd.DataFrame:
+        return self.frame('demand')
+
+    @property
+    def supply(self) -> pd.DataFrame:
+        return self.frame('supply')
+
+    def balance(self, out: np.ndarray = None) -> pd.DataFrame:
+        """
+        Supply minus demand for countries present in both panels.
+
+        Rows are matched once by label and the subtraction runs on the
+        mapped arrays; pass `out` to write into a preallocated array.
+        """
+        demand_rows = {c: i for i, c in enumerate(self._countries['demand'])}
+        shared = [(demand_rows[c], j) for j, c in enumerate(self._countries['supply']) if c in demand_rows]
+        d_idx = np.array([i for i, _ in shared], dtype=int)
+        s_idx = np.array([j for _, j in shared], dtype=int)
+        demand, supply = self._values['demand'], self._values['supply']
+        # Only gather rows when the panels are not already aligned
+        n = len(shared)
+        if not (np.array_equal(d_idx, np.arange(n)) and n == len(demand)):
+            demand = demand[d_idx]
+        if not (np.array_equal(s_idx, np.arange(n)) and n == len(supply)):
+            supply = supply[s_idx]
+        result = np.subtract(supply, demand, out=out)
+        countries = self._countries['supply'][s_idx]
+        return pd.DataFrame(result, index=pd.Index(countries, name='Time/Country'),
+                            columns=self.columns, copy=False)
+
+    def nbytes(self) -> int:
+        return sum(v.nbytes for v in self._values.values())
@@ -0,0 +1,240 @@
+"""
+Run all gasoline analyses in one process over a single loaded dataset.
+
+Usage (from the project root):
+    PYTHONPATH=src python -m pipeline
+    PYTHONPATH=src python -m pipeline --stages balance correlation --headless
+
+In headless mode the figures are queued while the stages run and rendered
+in one batch at the end, skipping any figure whose data is unchanged.
+Headless and table-only runs also skip whole stages whose data, code and
+parameters match the last run recorded in results/manifest.json.
+--profile writes the time, CPU and memory use of every stage, data load
+step, forecast fit and figure save (see profiling.py).
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from artifacts import ArtifactManifest, changed_files, snapshot, stage_key
+from data_loader import DEFAULT_FILL, get_dataset, list_datasets
+from forecast_engine import TOP_N
+from gap_fill import FILL_METHODS
+from log_config import LOG_MODE, LOG_MODES, configure_logging
+from profiling import PROFILE_DIR, Profiler, profile
+from rendering import RenderQueue
+
+# Stage name -> module holding its main(dataset, show, plots, renderer)
+STAGES = {
+    'balance': 'Combined_analysis',
+    'correlation': 'correlation_analysis',
+    'volatility': 'volatility_analysis',
+    'yearly': 'yearly_analysis',
+    'top_players': 'top_players_analysis',
+    'demand_forecast': 'demand_forecast',
+    'supply_forecast': 'supply_forecast',
+}
+
+# Shorthand names accepted on the command line
+STAGE_GROUPS = {
+    'forecast': ['demand_forecast', 'supply_forecast'],
+}
+
+# Stages whose main() accepts n_jobs, backend, use_cache and top_n
+FORECAST_STAGES = {'demand_forecast', 'supply_forecast'}
+
+
+def resolve_stages(names: Optional[List[str]]) -> List[str]:
+    """Expand group names and check stage names, keeping pipeline order"""
+    if not names:
+        return list(STAGES)
+
+    wanted = set()
+    for name in names:
+        if name in STAGE_GROUPS:
+            wanted.update(STAGE_GROUPS[name])
+        elif name in STAGES:
+            wanted.add(name)
+        else:
+            raise ValueError(f"Unknown stage: {name}")
+    return [name for name in STAGES if name in wanted]
+
+
+def run_pipeline(stages: Optional[List[str]] = None, file_path: str = None,
+                 headless: bool = False, use_cache: bool = True,
+                 n_jobs: int = 1, backend: str = 'statsmodels',
+                 plots: bool = True, dataset_name: str = None,
+                 fill: str = None, fill_limit: int = None,
+                 top_n: Optional[int] = TOP_N) -> List[Dict]:
+    """Load the data once and run each stage, returning per-stage timings
+
+    plots=False runs every stage in table-only mode, without importing
+    matplotlib at all. Headless runs queue the figures and render them
+    together after the last stage, in up to n_jobs processes.
+
+    When nothing is shown on screen, stages are skipped if their input hash
+    matches the artifact manifest; use_cache=False reruns everything.
+    fill and fill_limit choose how missing cells are imputed on load.
+    top_n is how many series the forecast stages fit (None = all).
+    """
+    renderer = None
+    if headless and plots:
+        import matplotlib
+        matplotlib.use('Agg')
+        renderer = RenderQueue(n_jobs=n_jobs, force=not use_cache)
+
+    # Interactive runs always execute, since showing the charts is the point
+    manifest = ArtifactManifest() if headless or not plots else None
+    recorded = {}
+
+    stages = resolve_stages(stages)
+    timings = []
+
+    start = time.perf_counter()
+    with profile('load', 'pipeline'):
+        dataset = get_dataset(file_path, dataset=dataset_name, use_cache=use_cache,
+                              fill=fill, fill_limit=fill_limit)
+    timings.append({'stage': 'load', 'seconds': time.perf_counter() - start,
+                    'status': 'ok' if dataset is not None else 'failed'})
+    if dataset is None:
+        print("No data loaded")
+        return timings
+
+    for name in stages:
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            module = importlib.import_module(STAGES[name])
+            options = {}
+            params = {'plots': plots}
+            if name in FORECAST_STAGES:
+                options = {'n_jobs': n_jobs, 'backend': backend, 'use_cache': use_cache, 'top_n': top_n}
+                params['backend'] = backend
+                params['top_n'] = top_n
+
+            if manifest is not None:
+                key = stage_key(module, dataset.fingerprint, params)
+                if use_cache and manifest.is_current(name, key):
+                    manifest.skip(name)
+                    timings.append({'stage': name, 'seconds': time.perf_counter() - start,
+                                    'status': 'unchanged'})
+                    continue
+                before = snapshot()
+                queued = len(renderer.jobs) if renderer is not None else 0
+
+            with profile(name, 'pipeline'):
+                module.main(dataset, show=plots and not headless, plots=plots, renderer=renderer, **options)
+
+            if manifest is not None:
+                figures = [path for job in (renderer.jobs[queued:] if renderer is not None else [])
+                           for path in job['outputs']]
+                recorded[name] = (key, changed_files(before, snapshot()), figures)
+        except Exception as e:
+            status = f'failed: {e}'
+            print(f"Stage {name} failed: {e}")
+            if manifest is not None:
+                manifest.forget(name)
+        timings.append({'stage': name, 'seconds': time.perf_counter() - start, 'status': status})
+
+    errors = {}
+    if renderer is not None:
+        start = time.perf_counter()
+        with profile('render', 'pipeline'):
+            errors = renderer.run()
+        status = 'ok' if not errors else f"failed: {len(errors)} figure(s)"
+        print(f"Figures rendered: {renderer.rendered}, unchanged: {renderer.skipped}")
+        timings.append({'stage': 'render', 'seconds': time.perf_counter() - start, 'status': status})
+
+    if manifest is not None:
+        # Stages are recorded once their figures exist, so a failed render reruns them
+        for name, (key, written, figures) in recorded.items():
+            if any(path in errors for path in figures):
+                manifest.forget(name)
+            else:
+                manifest.record(name, key, written + [path for path in figures if os.path.exists(path)])
+        manifest.save()
+
+    return timings
+
+
+def print_timing_report(timings: List[Dict]):
+    """Print how long each stage took"""
+    print("\nPipeline timing:")
+    for row in timings:
+        print(f"  {row['stage']:<16} {row['seconds']:8.3f}s  {row['status']}")
+    total = sum(row['seconds'] for row in timings)
+    print(f"  {'total':<16} {total:8.3f}s")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run the gasoline analyses in one process")
+    parser.add_argument('--stages', nargs='+', metavar='STAGE',
+                        help=f"stages to run (default: all). Choices: "
+                             f"{', '.join(list(STAGES) + list(STAGE_GROUPS))}")
+    parser.add_argument('--file', dest='file_path', help="workbook to load (default: auto-detect)")
+    parser.add_argument('--dataset', help="registered dataset to load, by name or part of its name")
+    parser.add_argument('--list-datasets', action='store_true', help="rescan and list the workbooks found, then exit")
+    parser.add_argument('--headless', action='store_true', help="save figures without showing them")
+    parser.add_argument('--tables-only', action='store_true', help="skip all figures, write tables only")
+    parser.add_argument('--no-cache', action='store_true', help="always re-parse the workbook, refit forecasts, redraw figures and rerun stages")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="worker processes for forecasting and figure rendering (-1 = all cores)")
+    forecast_series = parser.add_mutually_exclusive_group()
+    forecast_series.add_argument('--top-n', type=int, default=TOP_N,
+                                 help=f"forecast the N largest series per panel (default: {TOP_N})")
+    forecast_series.add_argument('--all-series', action='store_true',
+                                 help="forecast every country and region row")
+    parser.add_argument('--backend', choices=['statsmodels', 'numpy'], default='statsmodels',
+                        help="Holt-Winters implementation used by the forecast stages")
+    parser.add_argument('--fill', choices=FILL_METHODS, default=DEFAULT_FILL,
+                        help="how missing cells are filled when the workbook is cleaned")
+    parser.add_argument('--fill-limit', type=int, help="longest gap, in months, that --fill ffill bridges")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_DIR, metavar='DIR',
+                        help=f"write a per-stage time and memory report to DIR (default: {PROFILE_DIR})")
+    parser.add_argument('--trace', action='store_true', help="with --profile, also write a Chrome trace")
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help="with --profile, skip allocation tracking, which slows the run down")
+    parser.add_argument('--log', choices=LOG_MODES, default=LOG_MODE,
+                        help="log output: text, json (one object per line) or quiet (warnings only)")
+    args = parser.parse_args(argv)
+    configure_logging(args.log)
+
+    if args.list_datasets:
+        for i, entry in enumerate(list_datasets(rescan=True)):
+            default = ' (default)' if i == 0 else ''
+            print(f"{entry['name']}{default}\n    {entry['path']}  {entry['size']:,} bytes  sha256 {entry['sha256'][:12]}")
+        return 0
+
+    try:
+        stages = resolve_stages(args.stages)
+    except ValueError as e:
+        parser.error(str(e))
+
+    profiler = Profiler(trace_memory=not args.no_tracemalloc) if args.profile else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        timings = run_pipeline(stages, args.file_path, headless=args.headless,
+                               use_cache=not args.no_cache, n_jobs=args.jobs,
+                               backend=args.backend, plots=not args.tables_only, dataset_name=args.dataset,
+                               fill=args.fill, fill_limit=args.fill_limit,
+                               top_n=None if args.all_series else args.top_n)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    print_timing_report(timings)
+
+    if profiler is not None:
+        paths = profiler.write_report(args.profile)
+        if args.trace:
+            paths.append(profiler.write_chrome_trace(os.path.join(args.profile, 'trace.json')))
+        print(f"\nProfile written to {', '.join(paths)}")
+    return 0 if all(row['status'] in ('ok', 'unchanged') for row in timings) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Per-stage profiling for the pipeline: time, CPU and memory of each step.
+
+A Profiler records one entry per stage with its wall time, CPU time, the
+process peak RSS and the bytes allocated through Python (tracemalloc).
+Library code marks its steps with profile(name, ...), which does nothing
+unless a profiler is active, so the hooks cost nothing in normal runs.
+
+Stages nest: a pipeline stage contains the forecast fits and figure saves
+it triggers, and each keeps its own allocation peak. Work done in worker
+processes goes through pool_map, which profiles every call in the worker
+and sends the entries back with the results.
+
+The report is written as JSON (entries plus a per-stage summary) and CSV,
+and optionally as a Chrome trace for chrome://tracing or Perfetto.
+
+Peak RSS is the process high-water mark when the stage ended;
+rss_growth_mb is how much the stage raised it. Both are None where the
+resource module is unavailable (Windows).
+"""
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Default folder for profile reports
+PROFILE_DIR = './.cache/profile'
+
+_active: Optional["Profiler"] = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process so far, in MB.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if platform.system() == 'Darwin' else peak / 1024
+
+
+class Profiler:
+    """
+    Collects stage entries while active; use as a context manager or start()/stop().
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.records: List[Dict] = []
+        self.origin = time.time()
+        # [allocated at entry, running allocation peak] per open stage
+        self._stack: List[List[int]] = []
+        self._depth = 0
+        self._started_tracing = False
+        self._previous = None
+
+    def start(self) -> "Profiler":
+        global _active
+        self.origin = time.time()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._previous, _active = _active, self
+        return self
+
+    def stop(self) -> None:
+        global _active
+        _active = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @contextmanager
+    def stage(self, name: str, category: str = 'stage', **meta):
+        """
+        Time the enclosed block and record it under name, with meta as extra columns.
+        """
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._stack.append([current, current])
+
+        depth = self._depth
+        self._depth += 1
+        rss_before = peak_rss_mb()
+        start = time.time()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            self._depth -= 1
+            record = {
+                'name': name,
+                'category': category,
+                'pid': os.getpid(),
+                'depth': depth,
+                'start': start,
+                'wall_s': time.perf_counter() - wall,
+                'cpu_s': time.process_time() - cpu,
+                'peak_rss_mb': peak_rss_mb(),
+                'rss_growth_mb': None,
+                'alloc_peak_bytes': None,
+                'alloc_net_bytes': None,
+                'status': status,
+            }
+            if rss_before is not None:
+                record['rss_growth_mb'] = record['peak_rss_mb'] - rss_before
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                entered, running = self._stack.pop()
+                peak = max(running, peak)
+                record['alloc_peak_bytes'] = peak - entered
+                record['alloc_net_bytes'] = current - entered
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+                tracemalloc.reset_peak()
+            record.update(meta)
+            self.records.append(record)
+
+    def extend(self, records: Iterable[Dict]) -> None:
+        """
+        Add entries recorded elsewhere, e.g. in a worker process.
+        """
+        self.records.extend(records)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        One row per recorded stage, in the order they finished.
+        """
+        return pd.DataFrame(self.records)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Calls, total wall and CPU time and the largest memory figures per stage name.
+        """
+        df = self.to_frame()
+        if df.empty:
+            return df
+        grouped = df.groupby(['category', 'name'], sort=False)
+        summary = grouped.agg(
+            calls=('wall_s', 'size'),
+            wall_s=('wall_s', 'sum'),
+            cpu_s=('cpu_s', 'sum'),
+            max_wall_s=('wall_s', 'max'),
+            peak_rss_mb=('peak_rss_mb', 'max'),
+            alloc_peak_bytes=('alloc_peak_bytes', 'max'),
+        )
+        return summary.sort_values('wall_s', ascending=False).reset_index()
+
+    def write_report(self, directory: str = None) -> List[str]:
+        """
+        Write profile.json (entries and summary) and profile.csv; returns the paths.
+        """
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, 'profile.json')
+        csv_path = os.path.join(directory, 'profile.csv')
+
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.origin)),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'trace_memory': self.trace_memory,
+            'summary': json.loads(self.summary().to_json(orient='records')),
+            'records': json.loads(self.to_frame().to_json(orient='records')),
+        }
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        self.to_frame().to_csv(csv_path, index=False)
+        return [json_path, csv_path]
+
+    def write_chrome_trace(self, path: str = None) -> str:
+        """
+        Write the entries as complete events in the Chrome trace format.
+        """
+        path = path or os.path.join(PROFILE_DIR, 'trace.json')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fixed = {'name', 'category', 'pid', 'start', 'wall_s'}
+        events = []
+        for record in self.records:
+            events.append({
+                'name': record['name'] if 'country' not in record else f"{record['name']} {record['country']}",
+                'cat': record['category'],
+                'ph': 'X',
+                'ts': (record['start'] - self.origin) * 1e6,
+                'dur': record['wall_s'] * 1e6,
+                'pid': record['pid'],
+                'tid': 0,
+                'args': {k: v for k, v in record.items() if k not in fixed and v is not None},
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+def active() -> Optional[Profiler]:
+    """
+    The profiler currently recording, if any.
+    """
+    return _active
+
+
+@contextmanager
+def profile(name: str, category: str = 'stage', **meta):
+    """
+    Record the enclosed block with the active profiler; a no-op when none is active.
+    """
+    if _active is None:
+        yield
+        return
+    with _active.stage(name, category, **meta):
+        yield
+
+
+def _profiled_call(payload):
+    """
+    Run one call under a fresh profiler in a worker; returns (result, entries).
+    """
+    func, arg, name, category, meta, trace_memory = payload
+    with Profiler(trace_memory) as profiler:
+        with profiler.stage(name, category, **meta):
+            result = func(arg)
+    return result, profiler.records
+
+
+def pool_map(executor, func: Callable, items: List, name: str, category: str = 'stage',
+             metas: List[Dict] = None, chunksize: int = 1) -> List:
+    """
+    executor.map(func, items), with each call profiled in its worker when a profiler is active.
+
+    func must be a top-level function so it can be sent to the workers.
+    """
+    if _active is None:
+        return list(executor.map(func, items, chunksize=chunksize))
+    metas = metas or [{} for _ in items]
+    payloads = [(func, item, name, category, meta, _active.trace_memory) for item, meta in zip(items, metas)]
+    results = []
+    for result, records in executor.map(_profiled_call, payloads, chunksize=chunksize):
+        results.append(result)
+        _active.extend(records)
+    return results
@@ -0,0 +1,136 @@
+"""
+Top-N market rankings and concentration for every period at once.
+
+Demand, supply and the net position are brought to a common period grid
+(months, calendar periods or a trailing rolling window), stacked into one
+(roles x periods x countries) array and ranked with a single argpartition
+along the country axis. Concentration (top-N share and HHI) comes from
+the same matrices.
+"""
+from typing import Iterable, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from calendar_agg import CalendarGroups
+import rolling_stats
+
+# Ranking roles and how each one's score is built from demand/supply
+ROLES = ('consumers', 'producers', 'exporters', 'importers')
+
+
+def period_matrix(frame: pd.DataFrame, period: Union[str, int] = 'month') -> pd.DataFrame:
+    """
+    (countries x periods) averages for a period grid.
+
+    period is 'month', a calendar frequency ('year', 'quarter', 'season',
+    'gas_year') or a trailing window length in months.
+    """
+    if period == 'month':
+        return frame
+    if isinstance(period, int):
+        mean, _ = rolling_stats.rolling_moments(frame.to_numpy(dtype=float), period)
+        return pd.DataFrame(mean, index=frame.index, columns=frame.columns)
+    return CalendarGroups(frame.columns).aggregate(frame, period, 'mean')
+
+
+def top_n_indices(scores: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Column positions and values of the n largest entries along the last axis.
+
+    Works on any leading shape; results are sorted from largest down and
+    missing values rank last (as -inf). Ties are not ordered by position.
+    """
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    n = min(n, scores.shape[-1])
+    if n == 0:
+        empty = np.zeros(scores.shape[:-1] + (0,))
+        return empty.astype(np.intp), empty
+    part = np.argpartition(-scores, n - 1, axis=-1)[..., :n]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind='stable')
+    idx = np.take_along_axis(part, order, axis=-1)
+    return idx, np.take_along_axis(scores, idx, axis=-1)
+
+
+def concentration(values: np.ndarray, top_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-N share and Herfindahl-Hirschman index (0-10000) per period.
+
+    values is (periods x countries), top_values the (periods x n) leaders
+    from top_n_indices. Negative and missing volumes are ignored.
+    """
+    volumes = np.where(np.isfinite(values) & (values > 0), values, 0.0)
+    total = volumes.sum(axis=-1)
+    top = np.where(np.isfinite(top_values) & (top_values > 0), top_values, 0.0).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = top / total
+        hhi = ((volumes / total[..., None]) ** 2).sum(axis=-1) * 10000
+    return share, hhi
+
+
+def _drop_labels(index: pd.Index, exclude: set) -> pd.Index:
+    """
+    The index without the labels in exclude, compared without surrounding spaces.
+    """
+    return index[~index.astype(str).str.strip().isin(exclude)]
+
+
+def rank_markets(demand: pd.DataFrame, supply: pd.DataFrame, n: int = 10,
+                 period: Union[str, int] = 'year',
+                 exclude: Iterable[str] = ()) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Top-N consumers, producers, exporters and importers for every period.
+
+    Returns (rankings, concentration). rankings is a long table with one
+    row per period, role and rank; concentration has one row per period
+    with the top-N share and HHI of demand and supply. Countries named in
+    exclude (e.g. regional total rows) are left out.
+
+    Consumers are ranked over every demand row and producers over every
+    supply row; exporters and importers need both, so only markets in both
+    panels are ranked on their net position.
+    """
+    exclude = {str(c).strip() for c in exclude}
+    consumers = _drop_labels(demand.index, exclude)
+    producers = _drop_labels(supply.index, exclude)
+    # Shared country axis; a market missing from one panel scores NaN there and ranks last
+    markets = consumers.append(producers[~producers.isin(consumers)])
+    months = demand.columns[demand.columns.isin(supply.columns)]
+
+    d = period_matrix(demand.loc[consumers, months].reindex(markets), period)
+    s = period_matrix(supply.loc[producers, months].reindex(markets), period)
+    periods = d.columns
+    D = d.to_numpy(dtype=float).T
+    S = s.to_numpy(dtype=float).T
+    net = S - D
+
+    # Exporters need a surplus and importers a deficit; anything else ranks as missing
+    exports = np.where(net > 0, net, np.nan)
+    imports = np.where(net < 0, -net, np.nan)
+
+    # One argpartition over every role, period and country
+    scores = np.stack([D, S, exports, imports])
+    idx, top = top_n_indices(scores, n)
+    # Importers were ranked on -net; report their actual net position
+    top[3] = -top[3]
+
+    n_top = idx.shape[-1]
+    roles = np.repeat(np.array(ROLES), len(periods) * n_top)
+    rankings = pd.DataFrame({
+        'period': np.tile(np.repeat(np.asarray(periods), n_top), len(ROLES)),
+        'role': roles,
+        'rank': np.tile(np.arange(1, n_top + 1), len(ROLES) * len(periods)),
+        'market': np.asarray(markets)[idx.ravel()],
+        'value': top.ravel(),
+    })
+    rankings = rankings[np.isfinite(rankings['value'])].reset_index(drop=True)
+
+    d_share, d_hhi = concentration(D, top[0])
+    s_share, s_hhi = concentration(S, top[1])
+    summary = pd.DataFrame({
+        'demand_top_share': d_share,
+        'demand_hhi': d_hhi,
+        'supply_top_share': s_share,
+        'supply_hhi': s_hhi,
+    }, index=pd.Index(periods, name='period'))
+    return rankings, summary
@@ -0,0 +1,109 @@
+"""
+Country-to-region registry for regional totals.
+
+Regions are lists of member names, where a member is either a country or
+another region, so regions may overlap and nest. The registry expands the
+definitions once and compiles them into a (regions x countries) membership
+matrix for a given country index; a regional total of any per-country
+metric is then one matrix multiply over the whole time series.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rows in the JODI sheets that are already regional totals, not countries
+AGGREGATE_ROWS = ('Europe', 'MED', 'NWE', 'ARA')
+
+# Trading regions used by the balance analysis
+REGIONS = {
+    'ARA Hub': ['Netherlands', 'Belgium', 'Germany'],
+    'North West': ['United Kingdom', 'France'],
+    'Mediterranean': ['Spain', 'Italy', 'Greece'],
+    'East Europe': ['Poland', 'Czech Republic', 'Hungary'],
+}
+
+
+class RegionRegistry:
+    """
+    Named regions, expanded to country sets and compiled to matrices on demand.
+    """
+
+    def __init__(self, regions: Optional[Dict[str, Iterable[str]]] = None):
+        self._definitions: Dict[str, List[str]] = {}
+        self._members: Dict[str, List[str]] = {}
+        self._compiled = {}
+        for name, members in (REGIONS if regions is None else regions).items():
+            self.add(name, members)
+
+    def add(self, name: str, members: Iterable[str]) -> None:
+        """
+        Define or replace a region; members may name other regions.
+        """
+        self._definitions[name] = list(members)
+        self._members.clear()
+        self._compiled.clear()
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._definitions)
+
+    def members(self, name: str) -> List[str]:
+        """
+        Countries in a region with nested regions expanded, in definition order.
+        """
+        if name not in self._members:
+            self._members[name] = self._expand(name, ())
+        return list(self._members[name])
+
+    def _expand(self, name: str, path: tuple) -> List[str]:
+        if name in path:
+            raise ValueError(f"Region {name} contains itself: {' -> '.join(path + (name,))}")
+        countries = []
+        for member in self._definitions[name]:
+            nested = self._expand(member, path + (name,)) if member in self._definitions else [member]
+            countries.extend(c for c in nested if c not in countries)
+        return countries
+
+    def membership(self, countries: Iterable[str]) -> np.ndarray:
+        """
+        (regions x countries) 0/1 matrix for the given country order.
+
+        Compiled once per country index; countries a region lists but the
+        data does not contain are simply left out.
+        """
+        countries = tuple(countries)
+        if countries not in self._compiled:
+            position = {c: i for i, c in enumerate(countries)}
+            matrix = np.zeros((len(self._definitions), len(countries)))
+            for row, name in enumerate(self._definitions):
+                cols = [position[c] for c in self.members(name) if c in position]
+                matrix[row, cols] = 1.0
+            self._compiled[countries] = matrix
+        return self._compiled[countries]
+
+    def missing(self, countries: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Members of each region that are not in the given countries.
+        """
+        present = set(countries)
+        gaps = {name: [c for c in self.members(name) if c not in present] for name in self._definitions}
+        return {name: gap for name, gap in gaps.items() if gap}
+
+    def aggregate(self, data: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+        """
+        Regional totals of a per-country frame (countries x periods) or series.
+
+        Missing values count as zero, like summing only the countries
+        that have data.
+        """
+        M = self.membership(data.index)
+        values = data.to_numpy(dtype=float)
+        totals = M @ np.where(np.isfinite(values), values, 0.0)
+        index = pd.Index(self.names, name='Region')
+        if isinstance(data, pd.Series):
+            return pd.Series(totals, index=index, name=data.name)
+        return pd.DataFrame(totals, index=index, columns=data.columns)
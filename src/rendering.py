@@ -0,0 +1,196 @@
+"""
+Headless batch rendering of the analysis figures.
+
+Stages hand their plot functions and the precomputed data to a RenderQueue
+instead of drawing straight away. The queue hashes each job's inputs and
+the source of the plot function's module and the src/ modules it uses (so
+editing a helper the plot calls also redraws the figure), skips jobs whose
+hash matches the last run and whose files are still on disk, and renders
+the rest with the Agg backend, optionally in a process pool. Without a queue, draw() just calls the plot
+function, so the scripts keep their interactive behaviour.
+"""
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from artifacts import code_version
+from profiling import pool_map, profile
+
+logger = logging.getLogger(__name__)
+
+# Input hash of every rendered job, keyed on the job's first output file
+STATE_PATH = os.environ.get("GASOLINE_RENDER_STATE", "./.cache/render_state.json")
+
+
+def _update_digest(digest, value) -> None:
+    """
+    Feed a plot argument into the digest by content.
+
+    Pickles of pandas objects are not byte-stable between runs, so frames,
+    series and indexes are hashed through their values and labels.
+    """
+    if isinstance(value, pd.DataFrame):
+        _update_digest(digest, value.index)
+        _update_digest(digest, value.columns)
+        for column in value.columns:
+            _update_digest(digest, value[column].to_numpy())
+    elif isinstance(value, pd.Series):
+        _update_digest(digest, value.index)
+        digest.update(str(value.name).encode('utf-8'))
+        _update_digest(digest, value.to_numpy())
+    elif isinstance(value, pd.Index):
+        digest.update(repr(value.tolist()).encode('utf-8'))
+    elif isinstance(value, np.ndarray):
+        digest.update(str(value.dtype).encode('utf-8'))
+        # Object arrays hold pointers, so hash their items instead
+        if value.dtype == object:
+            digest.update(repr(value.tolist()).encode('utf-8'))
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode('utf-8'))
+        for item in value:
+            _update_digest(digest, item)
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(repr(key).encode('utf-8'))
+            _update_digest(digest, value[key])
+    else:
+        digest.update(repr(value).encode('utf-8'))
+
+
+def _job_hash(func: Callable, args: tuple, kwargs: Dict) -> str:
+    """
+    Fingerprint of a plot function's code and the data it is drawn from.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{func.__module__}.{func.__qualname__}".encode('utf-8'))
+    digest.update(code_version(sys.modules[func.__module__]).encode('utf-8'))
+    _update_digest(digest, args)
+    _update_digest(digest, kwargs)
+    return digest.hexdigest()
+
+
+def _render_job(job: Dict) -> Optional[str]:
+    """
+    Draw one figure with the Agg backend; returns an error message or None.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    try:
+        func = getattr(importlib.import_module(job['module']), job['name'])
+        func(*job['args'], show=False, **job['kwargs'])
+    except Exception as e:
+        return str(e)
+    finally:
+        import matplotlib.pyplot as plt
+        plt.close('all')
+    return None
+
+
+class RenderQueue:
+    """
+    Collects figure jobs from the stages and renders them in one batch.
+    """
+
+    def __init__(self, n_jobs: int = 1, state_path: str = None, force: bool = False):
+        self.n_jobs = n_jobs
+        self.state_path = state_path or STATE_PATH
+        self.force = force
+        self.jobs: List[Dict] = []
+        self.rendered = 0
+        self.skipped = 0
+
+    def submit(self, func: Callable, outputs: List[str], *args, **kwargs) -> None:
+        """
+        Queue func(*args, show=False, **kwargs), which writes the files in outputs.
+        """
+        self.jobs.append({
+            'module': func.__module__,
+            'name': func.__qualname__,
+            'outputs': list(outputs),
+            'args': args,
+            'kwargs': kwargs,
+            'hash': _job_hash(func, args, kwargs),
+        })
+
+    def _load_state(self) -> Dict[str, str]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: Dict[str, str]) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning("Could not write render state: %s", e)
+
+    def _is_current(self, job: Dict, state: Dict[str, str]) -> bool:
+        return (not self.force
+                and state.get(job['outputs'][0]) == job['hash']
+                and all(os.path.exists(path) for path in job['outputs']))
+
+    def run(self) -> Dict[str, str]:
+        """
+        Render every queued job whose inputs changed; returns {output: error}.
+        """
+        from forecast_engine import resolve_jobs
+
+        state = self._load_state()
+        pending = [job for job in self.jobs if not self._is_current(job, state)]
+        self.skipped += len(self.jobs) - len(pending)
+        self.jobs = []
+        if not pending:
+            return {}
+
+        # Jobs defined in a script run as __main__ cannot be looked up by
+        # name in a fresh worker, so those are always drawn in this process
+        n_workers = min(resolve_jobs(self.n_jobs), len(pending))
+        payloads = [{k: job[k] for k in ('module', 'name', 'outputs', 'args', 'kwargs')} for job in pending]
+        if n_workers > 1 and all(job['module'] != '__main__' for job in pending):
+            metas = [{'figure': job['outputs'][0]} for job in pending]
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                results = pool_map(pool, _render_job, payloads, 'save_figure', 'figure', metas)
+        else:
+            results = []
+            for payload in payloads:
+                with profile('save_figure', 'figure', figure=payload['outputs'][0]):
+                    results.append(_render_job(payload))
+
+        errors = {}
+        for job, error in zip(pending, results):
+            if error is None:
+                state[job['outputs'][0]] = job['hash']
+                self.rendered += 1
+            else:
+                state.pop(job['outputs'][0], None)
+                errors[job['outputs'][0]] = error
+                logger.warning("Rendering %s failed: %s", job['outputs'][0], error)
+        self._save_state(state)
+        return errors
+
+
+def draw(queue: Optional[RenderQueue], func: Callable, outputs: List[str], *args,
+         show: bool = True, **kwargs) -> None:
+    """
+    Queue a figure when a render queue is given, otherwise draw it now.
+    """
+    if queue is None:
+        with profile('save_figure', 'figure', figure=outputs[0]):
+            func(*args, show=show, **kwargs)
+    else:
+        queue.submit(func, outputs, *args, **kwargs)
@@ -0,0 +1,157 @@
+"""
+Rolling-window statistics over the whole country x month matrix.
+
+Every window is computed from cumulative sums along the month axis, so a
+full rolling panel costs O(countries x months) regardless of the window
+length. A window only gets a value when all of its months are present,
+matching pandas' rolling(window) default.
+
+Differences of cumulative sums carry rounding error of the order of the
+running total, so a window whose sum of squared deviations is within
+TOLERANCE of that total is treated as constant: its std is 0, its
+correlation NaN, and a mean that small is 0, giving a NaN CV.
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (12, 24, 36)
+
+# Relative size below which a windowed variance or mean is rounding noise
+TOLERANCE = 1e-10
+
+
+def _window_sums(X: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum of each trailing window along axis 1, NaN before the first full window.
+    """
+    S, T = X.shape
+    out = np.full((S, T), np.nan)
+    if window > T:
+        return out
+    csum = np.zeros((S, T + 1))
+    np.cumsum(X, axis=1, out=csum[:, 1:])
+    out[:, window - 1:] = csum[:, window:] - csum[:, :T - window + 1]
+    return out
+
+
+def _prepare(X: np.ndarray):
+    """
+    Zero-filled values and the mask of present cells.
+    """
+    X = np.asarray(X, dtype=float)
+    present = np.isfinite(X)
+    return np.where(present, X, 0.0), present
+
+
+def _complete(present: np.ndarray, window: int) -> np.ndarray:
+    return _window_sums(present.astype(float), window) == window
+
+
+def _sum_of_squares(Xc: np.ndarray, window: int):
+    """
+    Windowed sum of squares and the rounding error bound of its cumulative sums.
+    """
+    squares = Xc * Xc
+    return _window_sums(squares, window), TOLERANCE * np.cumsum(squares, axis=1)
+
+
+def _centred(s1: np.ndarray, s2: np.ndarray, noise: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum of squared deviations of each window, 0 where it is rounding noise.
+    """
+    m2 = s2 - s1 * s1 / window
+    return np.where(m2 > noise, m2, 0.0)
+
+
+def rolling_moments(X: np.ndarray, window: int):
+    """
+    Rolling mean and sample std (ddof=1) for every row.
+
+    Rows are centred on their own mean before summing so the
+    sum-of-squares formula does not lose precision on large levels.
+    """
+    X0, present = _prepare(X)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        offset = np.where(present.any(axis=1), X0.sum(axis=1) / present.sum(axis=1), 0.0)
+    Xc = np.where(present, X0 - offset[:, None], 0.0)
+
+    s1 = _window_sums(Xc, window)
+    s2, noise = _sum_of_squares(Xc, window)
+    complete = _complete(present, window)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.sqrt(_centred(s1, s2, noise, window) / (window - 1))
+    mean = s1 / window + offset[:, None]
+    # The mean carries the rounding of the offset and of the running sum
+    scale = np.abs(offset)[:, None] + np.sqrt(noise / TOLERANCE)
+    mean = np.where(np.abs(mean) > TOLERANCE * scale, mean, 0.0)
+    mean = np.where(complete, mean, np.nan)
+    std = np.where(complete, std, np.nan)
+    return mean, std
+
+
+def rolling_cv(frame: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    Rolling coefficient of variation (std / mean) per country, NaN where the mean is 0.
+    """
+    mean, std = rolling_moments(frame.to_numpy(dtype=float), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv = np.where(mean != 0, std / mean, np.nan)
+    return pd.DataFrame(cv, index=frame.index, columns=frame.columns)
+
+
+def rolling_correlation(demand: pd.DataFrame, supply: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    Rolling demand-supply Pearson correlation for every shared market.
+
+    NaN where either series is constant over the window, as in pandas.
+    """
+    markets = demand.index[demand.index.isin(supply.index)]
+    months = demand.columns[demand.columns.isin(supply.columns)]
+    D0, d_present = _prepare(demand.loc[markets, months].to_numpy(dtype=float))
+    S0, s_present = _prepare(supply.loc[markets, months].to_numpy(dtype=float))
+    complete = _complete(d_present & s_present, window)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        D0 = D0 - np.nanmean(np.where(d_present, D0, np.nan), axis=1, keepdims=True)
+        S0 = S0 - np.nanmean(np.where(s_present, S0, np.nan), axis=1, keepdims=True)
+    D0 = np.where(d_present, D0, 0.0)
+    S0 = np.where(s_present, S0, 0.0)
+
+    sd = _window_sums(D0, window)
+    ss = _window_sums(S0, window)
+    sdd, noise_d = _sum_of_squares(D0, window)
+    sss, noise_s = _sum_of_squares(S0, window)
+    sds = _window_sums(D0 * S0, window)
+
+    var_d = _centred(sd, sdd, noise_d, window)
+    var_s = _centred(ss, sss, noise_s, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sds - sd * ss / window
+        corr = cov / np.sqrt(var_d * var_s)
+    corr = np.where(complete & (var_d > 0) & (var_s > 0), np.clip(corr, -1.0, 1.0), np.nan)
+    return pd.DataFrame(corr, index=markets, columns=months)
+
+
+def rolling_panels(demand: pd.DataFrame, supply: pd.DataFrame,
+                   windows: Iterable[int] = WINDOWS) -> Dict[str, pd.DataFrame]:
+    """
+    Rolling demand CV, supply CV and demand-supply correlation per window.
+
+    Keys look like 'demand_cv_12m', 'supply_cv_12m' and 'correlation_12m'.
+    """
+    panels = {}
+    for window in windows:
+        panels[f'demand_cv_{window}m'] = rolling_cv(demand, window)
+        panels[f'supply_cv_{window}m'] = rolling_cv(supply, window)
+        panels[f'correlation_{window}m'] = rolling_correlation(demand, supply, window)
+    return panels
+
+
+def latest(panels: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Most recent value of each rolling panel, one column per panel.
+    """
+    return pd.concat({name: panel.iloc[:, -1] for name, panel in panels.items()}, axis=1)
@@ -0,0 +1,256 @@
+"""
+Cell-level validation of the raw demand and supply matrices.
+
+validate_panels runs on the frames as read from the workbook, before any
+cleaning or filling, and works on whole (countries x months) arrays. Each
+check produces a boolean mask over the panel, and the report keeps only
+the coordinates of the flagged cells, so problems can be located at scale
+without rescanning frames.
+
+Checks:
+- missing: empty cells
+- non_numeric: cells holding text such as '-' that cannot be read as numbers
+- negative: values below zero
+- zero_run: cells inside a run of at least `zero_run` consecutive zero months
+- outlier: robust z-score above `z_threshold`, from each country's median and MAD
+- misaligned: cells whose country or month has no counterpart in the other panel
+"""
+import argparse
+import logging
+import warnings
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHECKS = ('missing', 'non_numeric', 'negative', 'zero_run', 'outlier', 'misaligned')
+PANELS = ('demand', 'supply')
+
+# Defaults for the zero-run and outlier checks
+ZERO_RUN = 3
+Z_THRESHOLD = 3.5
+
+
+def _to_matrix(frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Float matrix of a raw frame plus the mask of non-empty cells that were not numbers.
+    """
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes):
+        X = frame.to_numpy(dtype=float)
+        return X, np.zeros(X.shape, dtype=bool)
+    X = frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return X, frame.notna().to_numpy() & np.isnan(X)
+
+
+def _drop_empty(frame: pd.DataFrame, text: np.ndarray) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Drop rows and columns with no value and no text cell, keeping the mask aligned.
+    """
+    filled = frame.notna().to_numpy() | text
+    rows, cols = filled.any(axis=1), filled.any(axis=0)
+    return frame.iloc[rows, cols], text[np.ix_(rows, cols)]
+
+
+def _forward_window_any(mask: np.ndarray, window: int) -> np.ndarray:
+    """
+    True where any of the `window` cells ending at each position along axis 1 is True.
+    """
+    S, T = mask.shape
+    csum = np.zeros((S, T + 1))
+    np.cumsum(mask, axis=1, out=csum[:, 1:])
+    lo = np.maximum(np.arange(T) - window + 1, 0)
+    return (csum[:, 1:] - csum[:, lo]) > 0
+
+
+def zero_run_mask(X: np.ndarray, min_run: int = ZERO_RUN) -> np.ndarray:
+    """
+    Cells that belong to a run of at least min_run consecutive zeros.
+    """
+    zero = X == 0
+    S, T = zero.shape
+    if min_run <= 1 or T < min_run:
+        return zero if min_run <= 1 else np.zeros_like(zero)
+    csum = np.zeros((S, T + 1))
+    np.cumsum(zero, axis=1, out=csum[:, 1:])
+    # full[:, t] marks a run of min_run zeros ending at month t
+    full = np.zeros((S, T), dtype=bool)
+    full[:, min_run - 1:] = (csum[:, min_run:] - csum[:, :T - min_run + 1]) == min_run
+    # A cell is in a run if one of those windows covers it, i.e. ends within min_run - 1 months after it
+    covered = _forward_window_any(full[:, ::-1], min_run)[:, ::-1]
+    return covered
+
+
+def robust_z(X: np.ndarray) -> np.ndarray:
+    """
+    Per-row robust z-score 0.6745 * (x - median) / MAD, NaN where MAD is zero.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # All-empty rows give an all-NaN slice warning; their z-scores are NaN anyway
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(X, axis=1, keepdims=True)
+        mad = np.nanmedian(np.abs(X - median), axis=1, keepdims=True)
+        z = 0.6745 * (X - median) / np.where(mad > 0, mad, np.nan)
+    return z
+
+
+class ValidationReport:
+    """
+    Flagged cell coordinates per check and panel, plus the label alignment.
+    """
+
+    def __init__(self, labels: Dict[str, Tuple[pd.Index, pd.Index]],
+                 cells: Dict[str, Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]],
+                 alignment: Dict[str, List]):
+        self.labels = labels
+        self.cells = cells
+        self.alignment = alignment
+
+    def count(self, check: str, panel: str = None) -> int:
+        panels = PANELS if panel is None else (panel,)
+        return sum(len(self.cells[check][p][0]) for p in panels)
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of flagged cells per check across both panels.
+        """
+        return {check: self.count(check) for check in CHECKS}
+
+    @property
+    def ok(self) -> bool:
+        return not any(self.counts().values())
+
+    def coordinates(self, check: str, panel: str) -> List[Tuple[str, str]]:
+        """
+        (country, month) labels of the cells a check flagged in one panel.
+        """
+        rows, cols, _ = self.cells[check][panel]
+        countries, months = self.labels[panel]
+        return list(zip(countries[rows], months[cols]))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        One row per flagged cell: check, panel, country, month and raw value.
+        """
+        parts = []
+        for check in CHECKS:
+            for panel in PANELS:
+                rows, cols, values = self.cells[check][panel]
+                if not len(rows):
+                    continue
+                countries, months = self.labels[panel]
+                parts.append(pd.DataFrame({
+                    'check': check,
+                    'panel': panel,
+                    'country': countries[rows],
+                    'month': months[cols],
+                    'value': values,
+                }))
+        if not parts:
+            return pd.DataFrame(columns=['check', 'panel', 'country', 'month', 'value'])
+        return pd.concat(parts, ignore_index=True)
+
+    def describe(self) -> str:
+        flagged = ", ".join(f"{check}={n}" for check, n in self.counts().items() if n)
+        return f"Validation: {flagged}" if flagged else "Validation: no issues"
+
+
+def validate_panels(demand: pd.DataFrame, supply: pd.DataFrame,
+                    zero_run: int = ZERO_RUN, z_threshold: float = Z_THRESHOLD,
+                    non_numeric: Dict[str, np.ndarray] = None) -> ValidationReport:
+    """
+    Run every check on the raw demand and supply frames.
+
+    Rows and columns that are entirely empty are ignored, as cleaning
+    drops them anyway. non_numeric optionally gives, per panel, a boolean
+    mask of text cells the reader already turned into NaN (see
+    data_loader.read_raw_workbook); text still in the frames is found
+    either way.
+    """
+    non_numeric = non_numeric or {}
+    frames = {'demand': demand, 'supply': supply}
+    text = {}
+    for name, df in frames.items():
+        mask = non_numeric.get(name)
+        frames[name], text[name] = _drop_empty(df, np.zeros(df.shape, dtype=bool) if mask is None else mask)
+    labels = {name: (df.index.astype(str), df.columns.astype(str)) for name, df in frames.items()}
+
+    # Countries and months the other panel lacks
+    d_countries, d_months = labels['demand']
+    s_countries, s_months = labels['supply']
+    only_in = {
+        'demand': (~d_countries.isin(s_countries), ~d_months.isin(s_months)),
+        'supply': (~s_countries.isin(d_countries), ~s_months.isin(d_months)),
+    }
+
+    cells = {check: {} for check in CHECKS}
+    for name, df in frames.items():
+        X, coerced = _to_matrix(df)
+        text_cells = coerced | text[name]
+        missing = np.isnan(X) & ~text_cells
+        with np.errstate(invalid='ignore'):
+            negative = X < 0
+            outlier = np.abs(robust_z(X)) > z_threshold
+        row_only, col_only = only_in[name]
+        misaligned = row_only[:, None] | col_only[None, :]
+
+        masks = {
+            'missing': missing,
+            'non_numeric': text_cells,
+            'negative': negative,
+            'zero_run': zero_run_mask(X, zero_run),
+            'outlier': outlier,
+            'misaligned': misaligned,
+        }
+        raw = df.to_numpy()
+        for check, mask in masks.items():
+            rows, cols = np.nonzero(mask)
+            cells[check][name] = (rows, cols, raw[rows, cols])
+
+    # Labels that only differ by surrounding whitespace, e.g. 'NWE' vs 'NWE '
+    d_only = list(d_countries[only_in['demand'][0]])
+    s_only = list(s_countries[only_in['supply'][0]])
+    stripped = {c.strip(): c for c in s_only}
+    alignment = {
+        'demand_only_countries': d_only,
+        'supply_only_countries': s_only,
+        'demand_only_months': list(d_months[only_in['demand'][1]]),
+        'supply_only_months': list(s_months[only_in['supply'][1]]),
+        'whitespace_mismatches': [(c, stripped[c.strip()]) for c in d_only if c.strip() in stripped],
+    }
+    return ValidationReport(labels, cells, alignment)
+
+
+def main(argv=None):
+    """Validate a workbook's raw sheets and write the flagged cells to CSV"""
+    from data_loader import find_excel_file, read_raw_workbook
+    from log_config import LOG_MODE, LOG_MODES, configure_logging
+
+    parser = argparse.ArgumentParser(description="Validate the raw demand/supply sheets")
+    parser.add_argument('--file', dest='file_path', help="workbook to check (default: auto-detect)")
+    parser.add_argument('--output', default='./results/tables/validation_issues.csv')
+    parser.add_argument('--zero-run', type=int, default=ZERO_RUN)
+    parser.add_argument('--z-threshold', type=float, default=Z_THRESHOLD)
+    parser.add_argument('--log', choices=LOG_MODES, default=LOG_MODE, help="log output: text, json or quiet")
+    args = parser.parse_args(argv)
+    configure_logging(args.log)
+
+    file_path = args.file_path or find_excel_file()
+    if file_path is None:
+        print("No workbook found")
+        return 1
+    demand, supply, non_numeric = read_raw_workbook(file_path)
+    report = validate_panels(demand, supply, args.zero_run, args.z_threshold, non_numeric)
+
+    print(report.describe())
+    for key, values in report.alignment.items():
+        if values:
+            print(f"  {key}: {values}")
+    report.to_frame().to_csv(args.output, index=False)
+    print(f"Flagged cells saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,27 +1,23 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
-from data_loader import load_gasoline_data
+from data_loader import get_dataset
+import rolling_stats
+from rendering import draw
 
-# make output folder
-os.makedirs('./results/figures/volatility_analysis', exist_ok=True)
+FIGURE = './results/figures/volatility_analysis/demand_supply_volatility.png'
 
-print("Demand vs Supply Volatility")
 
-# get the data
-demand, supply = load_gasoline_data()
+def coefficient_of_variation(dataset, name):
+    """Per-country volatility (std/mean) of demand or supply"""
+    return dataset.row_std(name) / dataset.row_mean(name)
 
-if demand is not None and supply is not None:
-    # calc volatility (std/mean)
-    demand_vol = demand.std(axis=1) / demand.mean(axis=1)
-    top_demand_vol = demand_vol.sort_values(ascending=False).head(15)
-    
-    supply_vol = supply.std(axis=1) / supply.mean(axis=1)  
-    top_supply_vol = supply_vol.sort_values(ascending=False).head(15)
+
+def plot_volatility(top_demand_vol, top_supply_vol, show=True):
+    """Top 15 demand and supply volatility bars"""
+    import matplotlib.pyplot as plt
     
     # create side-by-side chart
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 10))
-    
+
     # demand volatility chart
     bars1 = ax1.barh(top_demand_vol.index, top_demand_vol.values, color='orange', alpha=0.7)
     for bar, val in zip(bars1, top_demand_vol.values):
@@ -30,7 +26,7 @@ if demand is not None and supply is not None:
     ax1.set_title('Demand Volatility - Top 15')
     ax1.set_xlabel('Coefficient of Variation')
     ax1.grid(axis='x', alpha=0.3)
-    
+
     # supply volatility chart
     bars2 = ax2.barh(top_supply_vol.index, top_supply_vol.values, color='purple', alpha=0.7)
     for bar, val in zip(bars2, top_supply_vol.values):
@@ -39,30 +35,69 @@ if demand is not None and supply is not None:
     ax2.set_title('Supply Volatility - Top 15')
     ax2.set_xlabel('Coefficient of Variation')
     ax2.grid(axis='x', alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.savefig('./results/figures/volatility_analysis/demand_supply_volatility.png')
-    plt.show()
+    plt.savefig(FIGURE)
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+def main(dataset=None, show=True, plots=True, renderer=None):
+    """Run the volatility analysis (plots=False writes tables only, renderer queues the chart)"""
+    # make output folder
+    if plots:
+        os.makedirs('./results/figures/volatility_analysis', exist_ok=True)
+    os.makedirs('./results/tables', exist_ok=True)
+
+    print("Demand vs Supply Volatility")
+
+    # get the data
+    if dataset is None:
+        dataset = get_dataset()
+
+    if dataset is not None:
+        # calc volatility (std/mean)
+        demand_vol = coefficient_of_variation(dataset, 'demand')
+        top_demand_vol = demand_vol.sort_values(ascending=False).head(15)
     
-    # compare overall volatility
-    avg_d_vol = demand_vol.mean()
-    avg_s_vol = supply_vol.mean()
+        supply_vol = coefficient_of_variation(dataset, 'supply')
+        top_supply_vol = supply_vol.sort_values(ascending=False).head(15)
     
-    print(f"Avg demand volatility: {avg_d_vol:.3f}")
-    print(f"Avg supply volatility: {avg_s_vol:.3f}")
+        if plots:
+            draw(renderer, plot_volatility, [FIGURE], top_demand_vol, top_supply_vol, show=show)
     
-    if avg_d_vol > avg_s_vol:
-        print("Demand more volatile overall")
-    else:
-        print("Supply more volatile overall")
+        # compare overall volatility
+        avg_d_vol = demand_vol.mean()
+        avg_s_vol = supply_vol.mean()
+    
+        print(f"Avg demand volatility: {avg_d_vol:.3f}")
+        print(f"Avg supply volatility: {avg_s_vol:.3f}")
     
-    print("\nTop volatile demand markets:")
-    print(top_demand_vol.head())
+        if avg_d_vol > avg_s_vol:
+            print("Demand more volatile overall")
+        else:
+            print("Supply more volatile overall")
     
-    print("\nTop volatile supply markets:")
-    print(top_supply_vol.head())
+        print("\nTop volatile demand markets:")
+        print(top_demand_vol.head())
     
-    print("Chart saved")
+        print("\nTop volatile supply markets:")
+        print(top_supply_vol.head())
+        
+        # rolling 12/24/36-month volatility, latest window per market
+        rolling_cv = {}
+        for window in rolling_stats.WINDOWS:
+            rolling_cv[f'demand_cv_{window}m'] = rolling_stats.rolling_cv(dataset.demand, window)
+            rolling_cv[f'supply_cv_{window}m'] = rolling_stats.rolling_cv(dataset.supply, window)
+        rolling_stats.latest(rolling_cv).to_csv('./results/tables/rolling_volatility.csv')
     
-else:
-    print("No data loaded")
+        if plots:
+            print("Chart saved")
+    
+    else:
+        print("No data loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calendar_agg import CalendarGroups
+
+RULES = {'year': 'YE', 'quarter': 'QE', 'season': 'QE-FEB', 'gas_year': 'YE-SEP'}
+
+
+@pytest.fixture
+def panel():
+    # Starts in November, so every frequency has a partial leading period
+    months = pd.date_range('2017-11-01', periods=41, freq='MS')
+    rng = np.random.default_rng(2)
+    X = rng.normal(100, 20, size=(3, len(months)))
+    X[0, ::4] = np.nan
+    X[1, 5:8] = np.nan          # a whole calendar quarter missing
+    X[2, 0] = np.nan            # missing first month
+    return pd.DataFrame(X, index=['a', 'b', 'c'], columns=months.strftime('%Y-%m-%d'))
+
+
+def resampled(frame, rule, how):
+    by_time = frame.T.set_axis(pd.to_datetime(frame.columns)).resample(rule)
+    return getattr(by_time, how)().T
+
+
+@pytest.mark.parametrize('freq', list(RULES))
+@pytest.mark.parametrize('how', ['sum', 'mean'])
+def test_matches_resample(panel, freq, how):
+    result = CalendarGroups(panel.columns).aggregate(panel, freq, how)
+    expected = resampled(panel, RULES[freq], how)
+    pd.testing.assert_index_equal(result.columns, expected.columns, exact=False)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+
+@pytest.mark.parametrize('freq', list(RULES))
+def test_unsorted_columns(panel, freq):
+    shuffled = panel.iloc[:, np.random.default_rng(0).permutation(panel.shape[1])]
+    sums, means = CalendarGroups(shuffled.columns).sum_and_mean(shuffled, freq)
+    np.testing.assert_allclose(sums.to_numpy(), resampled(panel, RULES[freq], 'sum').to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(means.to_numpy(), resampled(panel, RULES[freq], 'mean').to_numpy(), rtol=1e-12)
+
+
+def test_leading_partial_periods(panel):
+    groups = CalendarGroups(panel.columns)
+    assert groups.labels('year')[0] == pd.Timestamp('2017-12-31')
+    assert groups.labels('season')[0] == pd.Timestamp('2017-11-30')
+    assert groups.labels('gas_year')[0] == pd.Timestamp('2018-09-30')
+    np.testing.assert_array_equal(groups.starts('quarter')[:3], [0, 2, 5])
+
+
+def test_unknown_frequency(panel):
+    with pytest.raises(ValueError):
+        CalendarGroups(panel.columns).aggregate(panel, 'week')
@@ -0,0 +1,63 @@
+"""Vectorized market correlations against the Series.corr loop they replace"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation_analysis import get_market_correlations, market_correlation_values, market_correlations
+
+
+def make_panels(n_markets=12, n_months=60, seed=0, gaps=False):
+    rng = np.random.default_rng(seed)
+    months = pd.date_range('2015-01-01', periods=n_months, freq='MS').astype(str)
+    markets = [f'market_{i}' for i in range(n_markets)]
+    demand = pd.DataFrame(rng.normal(100, 10, (n_markets, n_months)), index=markets, columns=months)
+    supply = demand * rng.normal(1.0, 0.1, demand.shape) + rng.normal(0, 5, demand.shape)
+    # A market only in demand and one only in supply
+    demand.loc['demand_only'] = rng.normal(100, 10, n_months)
+    supply.loc['supply_only'] = rng.normal(100, 10, n_months)
+    if gaps:
+        demand = demand.mask(rng.random(demand.shape) < 0.15)
+        supply = supply.mask(rng.random(supply.shape) < 0.15)
+    return demand, supply
+
+
+def reference(demand, supply, method='pearson', lag=0):
+    """Per-market Series.corr, pairing demand at t with supply at t + lag"""
+    values = {}
+    for market in demand.index:
+        if market in supply.index:
+            values[market] = demand.loc[market].corr(supply.loc[market].shift(-lag), method=method)
+    return pd.Series(values)
+
+
+def test_matches_original_loop():
+    demand, supply = make_panels()
+    expected = get_market_correlations(demand, supply)
+    result = market_correlations(demand, supply)
+    assert list(result['market']) == list(expected['market'])
+    np.testing.assert_allclose(result['correlation'], expected['correlation'], rtol=1e-10)
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+@pytest.mark.parametrize('lag', [0, 1, 3, -2])
+@pytest.mark.parametrize('gaps', [False, True])
+def test_matches_series_corr(method, lag, gaps):
+    demand, supply = make_panels(gaps=gaps)
+    markets, values = market_correlation_values(demand, supply, method, lag)
+    expected = reference(demand, supply, method, lag)
+    assert list(markets) == list(expected.index)
+    np.testing.assert_allclose(values, expected.to_numpy(), rtol=1e-10, atol=1e-12)
+
+
+def test_too_few_pairs_is_nan():
+    demand, supply = make_panels(n_markets=2, n_months=6)
+    supply.iloc[0, 1:] = np.nan
+    _, values = market_correlation_values(demand, supply)
+    assert np.isnan(values[0])
+    assert np.isfinite(values[1])
+
+
+def test_unknown_method():
+    demand, supply = make_panels(n_markets=2)
+    with pytest.raises(ValueError):
+        market_correlation_values(demand, supply, method='kendall')
@@ -0,0 +1,55 @@
+"""GasolineDataset must not let one stage change the data another stage sees"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import GasolineDataset
+
+
+@pytest.fixture
+def dataset():
+    months = pd.date_range('2020-01-01', periods=24, freq='MS').strftime('%Y-%m-%d')
+    countries = pd.Index(['Germany', 'France', 'Italy'], name='Time/Country')
+    rng = np.random.default_rng(0)
+    demand = pd.DataFrame(rng.uniform(50, 150, (3, 24)), index=countries, columns=months)
+    supply = pd.DataFrame(rng.uniform(50, 150, (3, 24)), index=countries, columns=months)
+    return GasolineDataset(demand, supply)
+
+
+def try_write(frame):
+    """Write a value the way an analysis might; read-only data may refuse"""
+    try:
+        frame.iloc[0, 0] = -1.0
+    except ValueError:
+        pass
+
+
+@pytest.mark.parametrize('get', [
+    lambda ds: ds.demand,
+    lambda ds: ds.supply,
+    lambda ds: ds.balance,
+    lambda ds: ds.timeseries('demand'),
+    lambda ds: ds.yearly('supply'),
+])
+def test_writes_do_not_reach_shared_frames(dataset, get):
+    before = get(dataset).to_numpy().copy()
+    try_write(get(dataset))
+    np.testing.assert_array_equal(get(dataset).to_numpy(), before)
+
+
+def test_writes_do_not_reach_memoized_series(dataset):
+    before = dataset.row_mean('demand').copy()
+    series = dataset.row_mean('demand')
+    try:
+        series.iloc[0] = -1.0
+    except ValueError:
+        pass
+    pd.testing.assert_series_equal(dataset.row_mean('demand'), before)
+
+
+def test_input_frame_is_not_shared(dataset):
+    # The caller's frame stays writable and independent of the dataset
+    demand = dataset.demand.copy()
+    ds = GasolineDataset(demand, dataset.supply)
+    demand.iloc[0, 0] = -1.0
+    assert ds.demand.iloc[0, 0] != -1.0
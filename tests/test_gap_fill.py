@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import DEFAULT_FILL, clean_dataframe
+from gap_fill import fill_gaps
+
+MONTHS = pd.date_range('2018-03-01', periods=40, freq='MS').strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def gappy():
+    rng = np.random.default_rng(11)
+    X = rng.normal(100, 10, size=(5, len(MONTHS)))
+    X[0, 3:9] = np.nan        # interior run
+    X[1, :4] = np.nan         # leading gap
+    X[1, -3:] = np.nan        # trailing gap
+    X[2, ::5] = np.nan        # scattered single months
+    X[3, 10:30] = np.nan      # long run, beyond any limit
+    X[4] = np.nan             # never observed
+    X[4, 17] = 42.0
+    return X
+
+
+def test_linear_matches_interpolate(gappy):
+    filled, mask = fill_gaps(gappy, 'linear')
+    expected = pd.DataFrame(gappy).interpolate(axis=1, limit_direction='both')
+    np.testing.assert_allclose(filled, expected.to_numpy())
+    np.testing.assert_array_equal(mask, np.isnan(gappy))
+
+
+@pytest.mark.parametrize('limit', [None, 1, 3, 12])
+def test_ffill_matches_pandas(gappy, limit):
+    filled, mask = fill_gaps(gappy, 'ffill', limit=limit)
+    expected = pd.DataFrame(gappy).ffill(axis=1, limit=limit).to_numpy()
+    np.testing.assert_array_equal(np.isnan(filled), np.isnan(expected))
+    np.testing.assert_allclose(filled, expected)
+    np.testing.assert_array_equal(mask, np.isnan(gappy) & ~np.isnan(expected))
+
+
+def test_seasonal_naive_takes_the_same_month_a_year_earlier():
+    X = np.arange(1.0, 49.0).reshape(1, 48)
+    X[0, 14] = np.nan                 # one gap: the value from month 2
+    X[0, 27:45] = np.nan              # gap over a year: chains back to the last observed year
+    X[0, 5] = np.nan                  # first year: nothing to copy
+    filled, mask = fill_gaps(X, 'seasonal_naive')
+
+    assert filled[0, 14] == 3.0
+    np.testing.assert_array_equal(filled[0, 27:36], X[0, 15:24])
+    np.testing.assert_array_equal(filled[0, 36:39], X[0, 24:27])
+    np.testing.assert_array_equal(filled[0, 39:45], X[0, 15:21])
+    assert np.isnan(filled[0, 5]) and not mask[0, 5]
+    np.testing.assert_array_equal(filled[np.isfinite(X)], X[np.isfinite(X)])
+
+
+def test_seasonal_naive_matches_shifting_by_a_year(gappy):
+    filled, _ = fill_gaps(gappy, 'seasonal_naive')
+    expected = pd.DataFrame(gappy)
+    for _ in range(gappy.shape[1] // 12 + 1):
+        expected = expected.fillna(expected.shift(12, axis=1))
+    np.testing.assert_allclose(filled, expected.to_numpy())
+
+
+def test_clean_dataframe_fills_linearly_by_default(gappy):
+    df = pd.DataFrame(gappy, index=[f'c{i}' for i in range(len(gappy))], columns=MONTHS)
+    assert DEFAULT_FILL == 'linear'
+    cleaned, mask = clean_dataframe(df, 'Demand', return_mask=True)
+    np.testing.assert_allclose(cleaned.to_numpy(), df.interpolate(axis=1, limit_direction='both').to_numpy())
+    assert mask.to_numpy().sum() == np.isnan(gappy).sum()
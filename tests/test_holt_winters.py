@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import holt_winters
+
+M = 12
+
+
+def seasonal_panel(n_series=4, n_months=96, noise=0.02, trend=True, seed=5):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_months)
+    base = rng.uniform(500, 5000, size=(n_series, 1))
+    slope = rng.normal(0, 0.002, size=(n_series, 1)) * base if trend else 0.0
+    season = 0.1 * base * np.sin(2 * np.pi * (t + rng.integers(0, M, size=(n_series, 1))) / M)
+    return base + slope * t + season + rng.normal(0, noise, size=(n_series, n_months)) * base
+
+
+@pytest.fixture
+def one_candidate(monkeypatch):
+    """Pin the parameter search to a single point so every fit picks the same parameters"""
+    monkeypatch.setattr(holt_winters, 'ALPHA_GRID', np.array([0.35]))
+    monkeypatch.setattr(holt_winters, 'BETA_GRID', np.array([0.05]))
+    monkeypatch.setattr(holt_winters, 'GAMMA_GRID', np.array([0.2]))
+    monkeypatch.setattr(holt_winters, '_refine_candidates', lambda best: best[:, None, :])
+
+
+@pytest.mark.parametrize('split', [24, 30, 47])
+def test_update_continues_the_full_fit(one_candidate, split):
+    Y = seasonal_panel()
+    state, sse_new = holt_winters.update(holt_winters.fit(Y[:, :split], M), Y[:, split:])
+    full = holt_winters.fit(Y, M)
+
+    for key in ('alpha', 'beta', 'gamma', 'level', 'trend', 'season', 'sse'):
+        np.testing.assert_allclose(state[key], full[key], rtol=1e-10, err_msg=key)
+    np.testing.assert_array_equal(state['n_obs'], full['n_obs'])
+    np.testing.assert_array_equal(state['valid'], full['valid'])
+    np.testing.assert_allclose(holt_winters.forecast(state, 18), holt_winters.forecast(full, 18), rtol=1e-10)
+    assert sse_new.shape == (Y.shape[0],) and (sse_new > 0).all()
+
+
+def test_forecast_seasons_line_up_after_update():
+    # Level plus season and no noise: every state is exact, so any slot shift shows up
+    Y = seasonal_panel(n_months=80, noise=0.0, trend=False)
+    state = holt_winters.fit(Y[:, :30], M)
+    state, _ = holt_winters.update(state, Y[:, 30:41])
+    state, _ = holt_winters.update(state, Y[:, 41:50])
+    assert (state['n_obs'] == 50).all()
+    np.testing.assert_allclose(holt_winters.forecast(state, 30), Y[:, 50:], rtol=1e-9)
+
+
+def test_short_and_incomplete_rows_are_invalid():
+    Y = seasonal_panel(n_series=3, n_months=40)
+    Y[1, 7] = np.nan
+    state = holt_winters.fit(Y, M)
+    np.testing.assert_array_equal(state['valid'], [True, False, True])
+    assert np.isnan(state['alpha'][1]) and np.isnan(state['level'][1])
+    assert np.isfinite(state['alpha'][[0, 2]]).all()
+
+    short = holt_winters.fit(seasonal_panel(n_series=2, n_months=2 * M - 1), M)
+    assert not short['valid'].any()
+    assert np.isnan(holt_winters.forecast(short, 6)).all()
+
+    # New observations with a gap invalidate a fitted series
+    updated, _ = holt_winters.update(state, np.where([[True], [True], [False]], Y[:, -3:], np.nan))
+    np.testing.assert_array_equal(updated['valid'], [True, False, False])
+
+
+def test_select_and_combine_round_trip():
+    state = holt_winters.fit(seasonal_panel(n_series=5), M)
+    parts = [holt_winters.select(state, [3, 4]), holt_winters.select(state, [0, 1, 2])]
+    merged = holt_winters.select(holt_winters.combine(parts), [2, 3, 4, 0, 1])
+    for key in state:
+        np.testing.assert_array_equal(merged[key], state[key])
+
+
+def test_forecasts_close_to_statsmodels():
+    ExponentialSmoothing = pytest.importorskip('statsmodels.tsa.holtwinters').ExponentialSmoothing
+    Y = seasonal_panel(n_series=3, n_months=96, noise=0.01)
+    ours = holt_winters.forecast(holt_winters.fit(Y, M), M)
+    reference = np.vstack([
+        ExponentialSmoothing(row, trend='add', seasonal='add', seasonal_periods=M).fit().forecast(M)
+        for row in Y
+    ])
+    mape = np.mean(np.abs(ours - reference) / np.abs(reference))
+    assert mape < 0.02
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import ingestion
+
+MONTHS = pd.date_range('2019-01-01', periods=36, freq='MS')
+COUNTRIES = ['Austria', 'Belgium', 'Croatia']
+
+
+@pytest.fixture
+def panels():
+    rng = np.random.default_rng(7)
+    demand = rng.normal(1e9, 50.0, size=(len(COUNTRIES), len(MONTHS)))
+    supply = demand + rng.normal(2e8, 30.0, size=demand.shape)
+    supply[1] -= 4e8
+    return (pd.DataFrame(demand, index=COUNTRIES, columns=MONTHS),
+            pd.DataFrame(supply, index=COUNTRIES, columns=MONTHS))
+
+
+def write_release(path, demand, supply):
+    """A release workbook in the JODI layout"""
+    wb = Workbook(write_only=True)
+    for title, df in (('Demand in Thousand kl', demand), ('Supply in Thousand kl', supply)):
+        ws = wb.create_sheet(title)
+        ws.append(['Time/Country'] + list(df.columns.to_pydatetime()))
+        for label, row in zip(df.index, df.to_numpy()):
+            ws.append([label] + [float(v) for v in row])
+    wb.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def releases(tmp_path, panels):
+    demand, supply = panels
+    first = write_release(tmp_path / 'release_1.xlsx', demand.iloc[:, :24], supply.iloc[:, :24])
+    # Overlaps the first release by 6 months, with revised values there
+    revised = demand.iloc[:, 18:].copy()
+    revised.iloc[:, :6] *= 1.5
+    second = write_release(tmp_path / 'release_2.xlsx', revised, supply.iloc[:, 18:])
+    return first, second
+
+
+def test_reingest_is_a_no_op(tmp_path, releases):
+    store = str(tmp_path / 'store')
+    first, _ = releases
+    assert ingestion.ingest_release(first, store) is not None
+    before = ingestion.derived_tables(store)
+
+    assert ingestion.ingest_release(first, store) is None
+    after = ingestion.derived_tables(store)
+    for name in before:
+        pd.testing.assert_frame_equal(before[name], after[name])
+    assert len(ingestion.load_manifest(store)['files']) == 1
+
+
+def test_overlapping_months_are_not_counted_twice(tmp_path, releases, panels):
+    store = str(tmp_path / 'store')
+    demand, supply = panels
+    for release in releases:
+        ingestion.ingest_release(release, store)
+
+    entries = ingestion.load_manifest(store)['files']
+    assert [len(entry['months']) for entry in entries] == [24, 12]
+
+    stored_demand, stored_supply = ingestion.load_store(store)
+    np.testing.assert_allclose(stored_demand.to_numpy(), demand.to_numpy())
+    np.testing.assert_allclose(stored_supply.to_numpy(), supply.to_numpy())
+
+    tables = ingestion.derived_tables(store)
+    yearly = tables['yearly_summary']
+    assert list(yearly.index) == [2019, 2020, 2021]
+    assert list(yearly['Months']) == [12, 12, 12]
+    np.testing.assert_allclose(yearly['Demand'], demand.T.groupby(MONTHS.year).sum().sum(axis=1))
+
+    balance = supply - demand
+    summary = tables['balance_summary'].loc[COUNTRIES]
+    np.testing.assert_allclose(summary['Avg_Balance'], balance.mean(axis=1), rtol=1e-12)
+    # Large levels: the merged centred moments keep the spread exact
+    np.testing.assert_allclose(summary['Balance_Volatility'], balance.std(axis=1), rtol=1e-6)
+    np.testing.assert_allclose(tables['market_leaders_summary']['avg_demand'], demand.mean(axis=1), rtol=1e-12)
+
+
+def test_crash_before_manifest_write_does_not_double_count(tmp_path, releases, monkeypatch):
+    store = str(tmp_path / 'store')
+    first, second = releases
+    ingestion.ingest_release(first, store)
+
+    def crash(path, payload):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(ingestion, '_write_json', crash)
+        with pytest.raises(OSError):
+            ingestion.ingest_release(second, store)
+    ingestion.ingest_release(second, store)
+
+    clean = str(tmp_path / 'clean')
+    for release in releases:
+        ingestion.ingest_release(release, clean)
+    for name, table in ingestion.derived_tables(clean).items():
+        pd.testing.assert_frame_equal(ingestion.derived_tables(store)[name], table)
+    aggregates = [f for f in os.listdir(store) if f.startswith('aggregates')]
+    assert aggregates == [ingestion.load_manifest(store)['aggregates']]
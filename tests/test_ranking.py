@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from ranking import rank_markets
+
+MONTHS = pd.date_range('2020-01-01', periods=24, freq='MS')
+
+
+def panel(rows):
+    return pd.DataFrame({month: rows for month in MONTHS}, index=list(rows)).astype(float)
+
+
+def test_single_panel_markets_keep_their_own_role():
+    demand = panel({'A': 50.0, 'B': 20.0, 'NWE': 100.0})
+    supply = panel({'A': 40.0, 'B': 30.0, 'NWE ': 90.0, 'C': 80.0})
+    rankings, _ = rank_markets(demand, supply, n=3)
+    first = rankings[rankings['period'] == rankings['period'].iloc[0]]
+
+    def markets(role):
+        return list(first.loc[first['role'] == role, 'market'])
+
+    assert markets('consumers') == ['NWE', 'A', 'B']
+    assert markets('producers') == ['NWE ', 'C', 'A']
+    assert markets('exporters') == ['B']
+    assert markets('importers') == ['A']
+
+
+def test_net_roles_only_list_markets_with_that_sign():
+    demand = panel({'A': 50.0, 'B': 20.0, 'C': 30.0, 'D': 10.0})
+    supply = panel({'A': 40.0, 'B': 30.0, 'C': 30.0, 'D': 15.0})
+    rankings, _ = rank_markets(demand, supply, n=10, period='month')
+
+    for role, expected in (('exporters', ['B', 'D']), ('importers', ['A'])):
+        picked = rankings[rankings['role'] == role]
+        assert picked.groupby('period').size().eq(len(expected)).all()
+        assert list(picked.loc[picked['period'] == MONTHS[0], 'market']) == expected
+
+    exporters = rankings.loc[rankings['role'] == 'exporters', 'value']
+    importers = rankings.loc[rankings['role'] == 'importers', 'value']
+    assert (exporters > 0).all() and (importers < 0).all()
+    assert np.isfinite(rankings['value']).all()
+
+
+def test_exclude_matches_labels_without_spaces():
+    demand = panel({'A': 50.0, 'NWE': 100.0})
+    supply = panel({'A': 40.0, 'NWE ': 90.0})
+    rankings, summary = rank_markets(demand, supply, n=2, exclude=['NWE'])
+    assert set(rankings['market']) == {'A'}
+    np.testing.assert_allclose(summary['demand_hhi'], 10000)
+    np.testing.assert_allclose(summary['supply_hhi'], 10000)
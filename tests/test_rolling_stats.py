@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import rolling_stats
+
+MONTHS = pd.date_range('2015-01-01', periods=72, freq='MS')
+WINDOW = 12
+
+
+def frame(*rows):
+    return pd.DataFrame(np.array(rows, dtype=float), index=[f'c{i}' for i in range(len(rows))],
+                        columns=MONTHS)
+
+
+@pytest.fixture
+def panels():
+    rng = np.random.default_rng(3)
+    demand = rng.normal(5000, 300, size=(4, len(MONTHS)))
+    supply = demand * rng.normal(1.0, 0.05, size=demand.shape)
+    demand[0, 20:32] = 0.0          # all-zero windows
+    demand[1, 40:52] = 7000.0       # constant windows
+    supply[2, 44:58] = 3.0
+    demand[3, 10] = np.nan          # gaps
+    supply[3, 60] = np.nan
+    return frame(*demand), frame(*supply)
+
+
+def reference(panel, func):
+    return panel.apply(lambda row: func(row.rolling(WINDOW)), axis=1)
+
+
+def assert_matches(result, expected):
+    # pandas can return +-inf for a constant window; the reference answer is NaN
+    expected = expected.where(np.isfinite(expected))
+    assert (result.isna() == expected.isna()).all().all()
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-6, atol=1e-9)
+
+
+def test_rolling_moments_match_pandas(panels):
+    demand, _ = panels
+    mean, std = rolling_stats.rolling_moments(demand.to_numpy(), WINDOW)
+    assert_matches(pd.DataFrame(mean, demand.index, MONTHS), reference(demand, lambda r: r.mean()))
+    assert_matches(pd.DataFrame(std, demand.index, MONTHS), reference(demand, lambda r: r.std()))
+
+
+def test_rolling_cv_matches_pandas(panels):
+    demand, _ = panels
+    expected = reference(demand, lambda r: r.std()) / reference(demand, lambda r: r.mean())
+    assert_matches(rolling_stats.rolling_cv(demand, WINDOW), expected)
+
+
+def test_rolling_correlation_matches_pandas(panels):
+    demand, supply = panels
+    expected = pd.DataFrame({market: demand.loc[market].rolling(WINDOW).corr(supply.loc[market])
+                             for market in demand.index}).T
+    assert_matches(rolling_stats.rolling_correlation(demand, supply, WINDOW), expected)
+
+
+def test_constant_and_zero_windows(panels):
+    demand, supply = panels
+    _, std = rolling_stats.rolling_moments(demand.to_numpy(), WINDOW)
+    cv = rolling_stats.rolling_cv(demand, WINDOW)
+    corr = rolling_stats.rolling_correlation(demand, supply, WINDOW)
+    assert std[0, 31] == 0.0 and np.isnan(cv.iloc[0, 31]) and np.isnan(corr.iloc[0, 31])
+    assert std[1, 51] == 0.0 and cv.iloc[1, 51] == 0.0 and np.isnan(corr.iloc[1, 51])
+    assert np.isnan(corr.iloc[2, 57])
+
+
+def test_large_levels_keep_precision(panels):
+    # pandas loses digits at this level, so compare with the same data shifted down
+    demand, supply = panels
+    level = 1e9
+    _, std = rolling_stats.rolling_moments((demand + level).to_numpy(), WINDOW)
+    _, expected = rolling_stats.rolling_moments(demand.to_numpy(), WINDOW)
+    np.testing.assert_allclose(std, expected, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(rolling_stats.rolling_correlation(demand + level, supply + level, WINDOW),
+                               rolling_stats.rolling_correlation(demand, supply, WINDOW),
+                               rtol=1e-6, atol=1e-9)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from validation import robust_z, validate_panels, zero_run_mask
+
+MONTHS = [f'2020-0{m}-01' for m in range(1, 9)]
+
+
+@pytest.fixture
+def raw():
+    """Raw sheets as read from a workbook: text placeholders, gaps and a stray label"""
+    demand = pd.DataFrame([
+        [10, 11, 12, '-', 10, 11, 12, 10],
+        [5, 0, 0, 0, 5, -2, 6, 5],
+        [20, 21, None, 20, 22, 21, 20, 500],
+    ], index=['A', 'B', 'NWE'], columns=MONTHS, dtype=object)
+    supply = pd.DataFrame([
+        [8, 9, 8, 9, 8, 9, 8, None],
+        [4, 5, 4, 5, 4, 5, 4, None],
+        [15, 16, 15, 16, 15, 16, 15, None],
+    ], index=['A', 'B', 'NWE '], columns=MONTHS, dtype=float)
+    # The supply sheet has an empty trailing column, which is ignored
+    return demand, supply
+
+
+def test_each_check_flags_its_cells(raw):
+    report = validate_panels(*raw)
+
+    assert report.coordinates('non_numeric', 'demand') == [('A', '2020-04-01')]
+    assert report.coordinates('missing', 'demand') == [('NWE', '2020-03-01')]
+    assert report.coordinates('negative', 'demand') == [('B', '2020-06-01')]
+    assert report.coordinates('zero_run', 'demand') == [('B', '2020-02-01'), ('B', '2020-03-01'),
+                                                         ('B', '2020-04-01')]
+    assert report.coordinates('outlier', 'demand') == [('NWE', '2020-08-01')]
+
+    misaligned = report.coordinates('misaligned', 'demand')
+    assert len(misaligned) == 10
+    assert {month for country, month in misaligned if country != 'NWE'} == {'2020-08-01'}
+    assert {country for country, _ in report.coordinates('misaligned', 'supply')} == {'NWE '}
+
+    counts = report.counts()
+    assert counts == {'missing': 1, 'non_numeric': 1, 'negative': 1, 'zero_run': 3,
+                      'outlier': 1, 'misaligned': 17}
+    for check in ('missing', 'non_numeric', 'negative', 'zero_run', 'outlier'):
+        assert report.count(check, 'supply') == 0
+    assert not report.ok
+
+
+def test_alignment_report(raw):
+    alignment = validate_panels(*raw).alignment
+    assert alignment['demand_only_countries'] == ['NWE']
+    assert alignment['supply_only_countries'] == ['NWE ']
+    assert alignment['whitespace_mismatches'] == [('NWE', 'NWE ')]
+    assert alignment['demand_only_months'] == ['2020-08-01']
+    assert alignment['supply_only_months'] == []
+
+
+def test_flagged_cells_frame_and_summary(raw):
+    report = validate_panels(*raw)
+    frame = report.to_frame()
+    assert list(frame.columns) == ['check', 'panel', 'country', 'month', 'value']
+    assert len(frame) == sum(report.counts().values())
+
+    text = frame[frame['check'] == 'non_numeric'].iloc[0]
+    assert (text['panel'], text['country'], text['month'], text['value']) == ('demand', 'A', '2020-04-01', '-')
+    assert frame.loc[frame['check'] == 'outlier', 'value'].tolist() == [500]
+    assert report.describe() == ("Validation: missing=1, non_numeric=1, negative=1, zero_run=3, "
+                                 "outlier=1, misaligned=17")
+
+
+def test_text_mask_from_the_reader(raw):
+    demand, supply = raw
+    # The single-pass reader hands over numbers with NaN where the text was, plus a mask
+    numeric = demand.replace('-', np.nan).astype(float)
+    mask = np.zeros(numeric.shape, dtype=bool)
+    mask[0, 3] = True
+    report = validate_panels(numeric, supply, non_numeric={'demand': mask})
+    assert report.coordinates('non_numeric', 'demand') == [('A', '2020-04-01')]
+    assert report.coordinates('missing', 'demand') == [('NWE', '2020-03-01')]
+
+
+def test_clean_panels_pass():
+    months = MONTHS[:6]
+    demand = pd.DataFrame([[10, 12, 11, 13, 12, 11]], index=['A'], columns=months, dtype=float)
+    report = validate_panels(demand, demand * 0.9)
+    assert report.ok
+    assert report.describe() == "Validation: no issues"
+    assert report.to_frame().empty
+
+
+def test_zero_run_mask_needs_the_full_run():
+    X = np.array([[0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 0]], dtype=float)
+    np.testing.assert_array_equal(np.flatnonzero(zero_run_mask(X, 3)), [3, 4, 5, 7, 8, 9, 10])
+    np.testing.assert_array_equal(np.flatnonzero(zero_run_mask(X, 4)), [7, 8, 9, 10])
+
+
+def test_robust_z_is_nan_without_spread():
+    z = robust_z(np.array([[5.0, 5.0, 5.0, 9.0], [1.0, 2.0, 3.0, 100.0], [np.nan] * 4]))
+    assert np.isnan(z[0]).all()
+    assert z[1, 3] == pytest.approx(0.6745 * 97.5 / 1.0)
+    assert np.isnan(z[2]).all()